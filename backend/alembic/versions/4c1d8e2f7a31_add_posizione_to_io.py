@@ -0,0 +1,31 @@
+"""add_posizione_to_io
+
+Revision ID: 4c1d8e2f7a31
+Revises: 0a9e257da861
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1d8e2f7a31'
+down_revision: Union[str, Sequence[str], None] = '0a9e257da861'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('t_io', sa.Column('posizione', sa.String(length=50), nullable=True))
+    # Free I/Os are looked up by project and type on every automatic assignment
+    op.create_index('ix_t_io_prg_tipo_modulo', 't_io', ['id_prg', 'tipo', 'id_modulo'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_t_io_prg_tipo_modulo', table_name='t_io')
+    op.drop_column('t_io', 'posizione')
@@ -0,0 +1,38 @@
+"""add_io_assegnati_to_hardware_node
+
+Revision ID: 7e3a9b5c2d14
+Revises: 4c1d8e2f7a31
+Create Date: 2026-10-18 11:40:02.530871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e3a9b5c2d14'
+down_revision: Union[str, Sequence[str], None] = '4c1d8e2f7a31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('t_nodo_hw', sa.Column('io_assegnati', sa.Integer(), nullable=True, server_default='0'))
+    
+    # Initialise fill levels from the current assignments
+    op.execute("""
+        UPDATE t_nodo_hw
+        SET io_assegnati = (
+            SELECT COUNT(*)
+            FROM t_io
+            WHERE t_io.id_modulo = t_nodo_hw.id_nodo_hw
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('t_nodo_hw', 'io_assegnati')
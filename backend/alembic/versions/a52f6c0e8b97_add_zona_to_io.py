@@ -0,0 +1,28 @@
+"""add_zona_to_io
+
+Revision ID: a52f6c0e8b97
+Revises: 7e3a9b5c2d14
+Create Date: 2026-10-18 14:05:17.902344
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a52f6c0e8b97'
+down_revision: Union[str, Sequence[str], None] = '7e3a9b5c2d14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('t_io', sa.Column('zona', sa.String(length=100), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('t_io', 'zona')
@@ -0,0 +1,28 @@
+"""add_config_hash_to_node
+
+Revision ID: c81d4f3a6e52
+Revises: a52f6c0e8b97
+Create Date: 2026-10-18 15:22:48.614030
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81d4f3a6e52'
+down_revision: Union[str, Sequence[str], None] = 'a52f6c0e8b97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('t_nodo', sa.Column('config_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('t_nodo', 'config_hash')
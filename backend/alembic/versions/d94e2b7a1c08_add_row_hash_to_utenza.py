@@ -0,0 +1,28 @@
+"""add_row_hash_to_utenza
+
+Revision ID: d94e2b7a1c08
+Revises: c81d4f3a6e52
+Create Date: 2026-10-18 16:05:12.381204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd94e2b7a1c08'
+down_revision: Union[str, Sequence[str], None] = 'c81d4f3a6e52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('t_utenza', sa.Column('row_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('t_utenza', 'row_hash')
@@ -0,0 +1,31 @@
+"""add_id_utenza_to_io
+
+Revision ID: e3b7c1d9f420
+Revises: d94e2b7a1c08
+Create Date: 2026-10-18 16:48:30.127455
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b7c1d9f420'
+down_revision: Union[str, Sequence[str], None] = 'd94e2b7a1c08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('t_io', sa.Column('id_utenza', sa.Integer(), nullable=True))
+    # Pre-elaboration replaces the I/Os of a utility by id_utenza
+    op.create_index('ix_t_io_id_utenza', 't_io', ['id_utenza'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_t_io_id_utenza', table_name='t_io')
+    op.drop_column('t_io', 'id_utenza')
@@ -29,6 +29,29 @@ class Settings(BaseSettings):
     static_dir: str = Field(default="static")
     templates_dir: str = Field(default="templates")
     uploads_dir: str = Field(default="uploads")
+    upload_spool_max_size: int = Field(default=16 * 1024 * 1024)  # uploads above this size spill to a temp file
+    
+    # Utilities import
+    utenze_import_batch_size: int = Field(default=1000)  # rows inserted per flush
+    excel_parse_executor: str = Field(default="thread")  # "thread" or "process"
+    excel_parse_max_workers: int = Field(default=2)
+    
+    # I/O assignment
+    io_assign_max_concurrency: int = Field(default=4)  # nodes loaded in parallel
+    
+    # Background jobs
+    job_max_workers: int = Field(default=2)
+    job_retention_seconds: int = Field(default=3600)  # finished jobs kept for polling
+    
+    # Export artifacts
+    export_dir: str = Field(default="export_files")
+    export_cache_max_bytes: int = Field(default=512 * 1024 * 1024)  # total size of stored artifacts
+    export_cache_max_entries: int = Field(default=500)
+    export_spool_max_size: int = Field(default=16 * 1024 * 1024)  # bundle buffers above this size spill to a temp file
+
+    # Automatic PLC configuration
+    plc_max_slots_per_rack: int = Field(default=32)
+    plc_max_io_per_cpu: int = Field(default=2048)
     
     model_config = SettingsConfigDict(
         env_file=".env",
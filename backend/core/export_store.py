@@ -0,0 +1,170 @@
+"""
+Content-addressed store of generated export artifacts.
+
+Artifacts are keyed by project, artifact name and a version hash of the
+project data, and live under ``settings.export_dir/<id_prg>/``::
+
+    export_files/12/export_io-3f2a9c1e0b7d4a55.xml
+
+Exporting unchanged data again is served from disk. Storing a new version of
+an artifact removes the project's older versions of it, and the store as a
+whole is kept below ``settings.export_cache_max_bytes`` and
+``settings.export_cache_max_entries`` by evicting the least recently used
+files (the last use is recorded in the file's mtime).
+"""
+import asyncio
+import logging
+import os
+import shutil
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Length of the version prefix used in artifact file names
+VERSION_LENGTH = 16
+
+ArtifactBuilder = Callable[[str], Awaitable[Any]]
+
+
+class ExportStore:
+    """Per-project export artifacts with LRU/size eviction"""
+
+    def __init__(self, root: str, max_bytes: int, max_entries: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._locks: Dict[Tuple[int, str, str], asyncio.Lock] = {}
+
+    def project_dir(self, id_prg: int) -> str:
+        return os.path.join(self.root, str(id_prg))
+
+    def path_for(self, id_prg: int, name: str, version: str) -> str:
+        stem, ext = os.path.splitext(name)
+        return os.path.join(self.project_dir(id_prg), f"{stem}-{version[:VERSION_LENGTH]}{ext}")
+
+    def get(self, id_prg: int, name: str, version: str) -> Optional[str]:
+        """Return the stored artifact for this data version, or None"""
+        path = self.path_for(id_prg, name, version)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)  # mark as recently used
+        return path
+
+    def latest(self, id_prg: int, name: str) -> Optional[str]:
+        """Return the most recently stored or used version of an artifact, or None"""
+        versions = self._versions(id_prg, name)
+        if not versions:
+            return None
+        path = max(versions, key=os.path.getmtime)
+        os.utime(path)
+        return path
+
+    async def get_or_build(
+        self,
+        id_prg: int,
+        name: str,
+        version: str,
+        build: ArtifactBuilder
+    ) -> Tuple[str, bool]:
+        """
+        Return the artifact for this data version, building it on a miss.
+
+        ``build(path)`` writes the artifact to a temporary path that is moved
+        into place once complete, so readers never see a partial file.
+        Concurrent requests for the same artifact wait for a single build.
+
+        Returns:
+            Tuple (path, cached)
+        """
+        key = (id_prg, name, version)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                path = self.get(id_prg, name, version)
+                if path:
+                    return path, True
+
+                path = self.path_for(id_prg, name, version)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+                try:
+                    await build(tmp_path)
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+        finally:
+            if not lock.locked():
+                self._locks.pop(key, None)
+
+        for stale in self._versions(id_prg, name):
+            if stale != path:
+                self._remove(stale)
+        self.evict(keep=path)
+        logger.info(f"Stored export artifact {path}")
+        return path, False
+
+    def invalidate(self, id_prg: int) -> None:
+        """Drop every artifact of a project"""
+        shutil.rmtree(self.project_dir(id_prg), ignore_errors=True)
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Remove least recently used artifacts until the store is within its limits"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes and count <= self.max_entries:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            total -= size
+            count -= 1
+
+    def _versions(self, id_prg: int, name: str) -> List[str]:
+        stem, ext = os.path.splitext(name)
+        directory = self.project_dir(id_prg)
+        if not os.path.isdir(directory):
+            return []
+        length = len(stem) + 1 + VERSION_LENGTH + len(ext)
+        return [
+            os.path.join(directory, entry) for entry in os.listdir(directory)
+            if len(entry) == length and entry.startswith(f"{stem}-") and entry.endswith(ext)
+        ]
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) of every stored artifact; loose files in the root are not managed"""
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for project in os.listdir(self.root):
+            directory = os.path.join(self.root, project)
+            if not project.isdigit() or not os.path.isdir(directory):
+                continue
+            for entry in os.listdir(directory):
+                if entry.endswith(".tmp"):
+                    continue
+                path = os.path.join(directory, entry)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+            logger.info(f"Evicted export artifact {path}")
+        except FileNotFoundError:
+            pass
+
+
+export_store = ExportStore(
+    settings.export_dir,
+    settings.export_cache_max_bytes,
+    settings.export_cache_max_entries
+)
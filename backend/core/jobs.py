@@ -0,0 +1,124 @@
+"""
+In-process background jobs for long-running project operations.
+
+Jobs run as asyncio tasks inside the API process, at most
+``settings.job_max_workers`` at a time; no external broker is needed. State is
+kept in memory and finished jobs are evicted after
+``settings.job_retention_seconds``. Each job gets a ``progress`` callback that
+the scripts call with their counters (phase, rows processed, ...).
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+JobFunction = Callable[[Callable[..., None]], Awaitable[Any]]
+
+
+class Job:
+    """State of a single background job"""
+
+    def __init__(self, kind: str, owner: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.status = JOB_QUEUED
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def report(self, **counters: Any) -> None:
+        """Progress callback handed to the job function"""
+        self.progress.update(counters)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """Registry and bounded runner of background jobs"""
+
+    def __init__(self, max_workers: int, retention_seconds: int):
+        self.jobs: Dict[str, Job] = {}
+        self.retention_seconds = retention_seconds
+        self._workers = asyncio.Semaphore(max_workers)
+
+    def submit(self, kind: str, func: JobFunction, owner: Optional[str] = None) -> Job:
+        """
+        Schedule ``func(progress)`` and return its job immediately.
+
+        Args:
+            kind: Job type, e.g. "crea_plc_automatico"
+            func: Coroutine function receiving the progress callback
+            owner: Username of the submitter
+        """
+        self._evict_finished()
+        job = Job(kind, owner)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, func))
+        logger.info(f"Job {job.id} ({kind}) submitted")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; finished jobs are returned unchanged"""
+        job = self.jobs.get(job_id)
+        if job and job.status not in FINISHED_STATES and job.task:
+            job.task.cancel()
+        return job
+
+    async def _run(self, job: Job, func: JobFunction) -> None:
+        try:
+            async with self._workers:
+                job.status = JOB_RUNNING
+                job.started_at = time.time()
+                job.result = await func(job.report)
+            job.status = JOB_COMPLETED
+        except asyncio.CancelledError:
+            job.status = JOB_CANCELLED
+            logger.info(f"Job {job.id} ({job.kind}) cancelled")
+        except Exception as e:
+            job.status = JOB_FAILED
+            job.error = str(e)
+            logger.error(f"Job {job.id} ({job.kind}) failed: {e}", exc_info=True)
+        finally:
+            job.finished_at = time.time()
+
+    def _evict_finished(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.status in FINISHED_STATES and job.finished_at and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+
+job_manager = JobManager(settings.job_max_workers, settings.job_retention_seconds)
@@ -11,7 +11,8 @@ import logging
 from core.config import settings
 from routers.legacy import router as legacy_router
 from core.database import init_database
-from routers import auth_router, projects_router, nodes_router, hardware_router, io_router
+from scripts.carica_file_utenze_mock_alchemy import shutdown_parse_executor
+from routers import auth_router, projects_router, nodes_router, hardware_router, io_router, jobs_router
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -30,6 +31,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down application...")
+    shutdown_parse_executor()
 
 
 # Initialize FastAPI app
@@ -65,6 +67,7 @@ app.include_router(projects_router, prefix="/api")
 app.include_router(nodes_router, prefix="/api")
 app.include_router(hardware_router, prefix="/api")
 app.include_router(io_router, prefix="/api")
+app.include_router(jobs_router, prefix="/api")
 app.include_router(legacy_router, prefix="/api")
 
 # Global exception handler
@@ -40,8 +40,11 @@ class IO(Base):
     tipo = Column(String, nullable=False)
     id_modulo = Column(Integer, ForeignKey("t_nodo_hw.id_nodo_hw"))
     indirizzo = Column(String)
+    posizione = Column(String(50))  # interno_quadro / pulsantiera / bordo_macchina
+    zona = Column(String(100))
     note = Column(Text)
     id_prg = Column(Integer, ForeignKey("t_progetti.id_prg"), nullable=False)
+    id_utenza = Column(Integer, index=True)  # utility the I/O was generated from (pre-elaboration)
     
     # Additional relationships if needed
     # modulo = relationship("HardwareNode", foreign_keys=[id_modulo])
\ No newline at end of file
@@ -29,6 +29,7 @@ class Node(Base):
     descrizione = Column(Text)
     id_prg = Column(Integer, ForeignKey("t_progetti.id_prg"), nullable=False)
     id_quadro = Column(Integer)
+    config_hash = Column(String(64))  # fingerprint of the automatic PLC configuration
     
     # Relationships
     project = relationship("Project", back_populates="nodes")
@@ -44,6 +45,7 @@ class HardwareNode(Base):
     id_hw = Column(Integer, ForeignKey("t_cat_hw.id_hw"), nullable=False)
     slot = Column(Integer)
     quantita = Column(Integer, default=1)
+    io_assegnati = Column(Integer, default=0)  # fill level, maintained by I/O assignment
     
     # Relationships
     node = relationship("Node", back_populates="hardware_nodes")
@@ -30,6 +30,7 @@ class Utenza(Base):
     id_opzione = Column(Integer, nullable=True)
     elaborata = Column(Integer, default=0)
     taglio = Column(String(50), nullable=True)
+    row_hash = Column(String(64), nullable=True)  # hash of the imported columns, for differential re-import
     
     # Relationships
     potenze = relationship("Potenza", back_populates="utenza", cascade="all, delete-orphan")
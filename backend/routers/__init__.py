@@ -7,6 +7,7 @@ from .nodes import router as nodes_router
 from .hardware import router as hardware_router
 from .io import router as io_router
 from .legacy import router as legacy_router
+from .jobs import router as jobs_router
 
 __all__ = [
     "auth_router",
@@ -14,5 +15,6 @@ __all__ = [
     "nodes_router",
     "hardware_router",
     "io_router",
-    "legacy_router"
+    "legacy_router",
+    "jobs_router"
 ]
\ No newline at end of file
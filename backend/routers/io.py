@@ -6,7 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from core.database import get_db
 from core.security import get_current_user
-from schemas.io import IOResponse, IOAssignRequest, IORemoveRequest
+from schemas.io import IOResponse, IOAssignRequest, IORemoveRequest, IOBulkAssignRequest, IOBulkRemoveRequest, IOBulkResponse
 from services.io_service import IOService
 
 router = APIRouter(prefix="/io", tags=["io"])
@@ -46,6 +46,26 @@ async def assign_io(
     return result
 
 
+@router.post("/assign/bulk", response_model=IOBulkResponse)
+async def assign_io_bulk(
+    bulk_data: IOBulkAssignRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Assign many I/Os to modules in one transaction"""
+    return await io_service.assign_io_bulk(db, bulk_data)
+
+
+@router.delete("/assign/bulk", response_model=IOBulkResponse)
+async def remove_io_assignment_bulk(
+    bulk_data: IOBulkRemoveRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Remove many I/O assignments in one transaction"""
+    return await io_service.remove_io_assignment_bulk(db, bulk_data)
+
+
 @router.delete("/assign/{io_id}")
 async def remove_io_assignment(
     io_id: int,
@@ -61,9 +81,42 @@ async def remove_io_assignment(
 async def assign_io_automatically(
     node_id: int = Query(...),
     project_id: int = Query(...),
+    dry_run: bool = Query(False),
+    incremental: bool = Query(False),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Assign I/O automatically.
+    With dry_run=true only the planned diff is returned; with incremental=true
+    only unassigned I/O are placed, using the stored module fill levels.
+    """
+    result = await io_service.assign_io_automatically(db, node_id, project_id, dry_run, incremental)
+    return result
+
+
+@router.post("/assign/auto/project")
+async def assign_io_automatically_project(
+    project_id: int = Query(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Assign I/O automatically for every PLC node of a project"""
+    result = await io_service.assign_io_automatically_project(db, project_id)
+    return result
+
+
+@router.post("/address")
+async def generate_io_addresses(
+    node_id: int = Query(...),
+    project_id: int = Query(...),
+    renumber: bool = Query(False),
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Assign I/O automatically"""
-    result = await io_service.assign_io_automatically(db, node_id, project_id)
-    return result
\ No newline at end of file
+    """
+    Generate PLC addresses (indirizzo) for the I/O assigned to a node.
+    Existing valid addresses are kept; with renumber=true all are reassigned.
+    """
+    result = await io_service.generate_io_addresses(db, node_id, project_id, renumber)
+    return result
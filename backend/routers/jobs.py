@@ -0,0 +1,177 @@
+"""
+Background job routes: submit long-running project operations and poll them
+"""
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, UploadFile, File
+import logging
+from core.database import AsyncSessionLocal
+from core.jobs import job_manager, Job, FINISHED_STATES
+from core.security import get_current_user
+from core.config import settings
+from schemas.job import JobResponse, JobResultResponse
+from scripts.assegna_io_alchemy import assegna_io_automaticamente, assegna_io_progetto
+from scripts.carica_file_utenze_mock_alchemy import process_excel_file, validate_uploaded_file, spool_upload
+from scripts.crea_nodo_alchemy import crea_nodo_plc_automatico
+from scripts.genera_schema_alchemy import genera_schema_csv
+from scripts.preelabora_utenze_alchemy import preelabora_utenze
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+logger = logging.getLogger(__name__)
+
+
+def get_user_job(job_id: str, current_user: dict) -> Job:
+    """Return the job if it exists and belongs to the current user"""
+    job = job_manager.get(job_id)
+    if not job or job.owner != current_user["username"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+
+@router.post("/crea_plc_automatico", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_crea_plc_automatico(
+    data: dict = Body(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """Create PLC nodes automatically in the background"""
+    id_prg = data.get("id_prg")
+    if not id_prg:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ID progetto (id_prg) è obbligatorio"
+        )
+    
+    async def run(progress):
+        return await crea_nodo_plc_automatico(
+            id_prg,
+            group_by_zona=bool(data.get("group_by_zona", False)),
+            max_slots_per_rack=data.get("max_slots_per_rack"),
+            max_io_per_cpu=data.get("max_io_per_cpu"),
+            progress=progress
+        )
+    
+    return job_manager.submit("crea_plc_automatico", run, current_user["username"]).to_dict()
+
+
+@router.post("/assign_io_auto", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_assign_io_auto(
+    project_id: int = Query(...),
+    node_id: int = Query(None),
+    incremental: bool = Query(False),
+    current_user: dict = Depends(get_current_user)
+):
+    """Assign I/O automatically in the background, for one node or (without node_id) the whole project"""
+    async def run(progress):
+        if node_id is None:
+            return await assegna_io_progetto(project_id, progress=progress)
+        return await assegna_io_automaticamente(
+            project_id, node_id, incremental=incremental, progress=progress
+        )
+    
+    return job_manager.submit("assign_io_auto", run, current_user["username"]).to_dict()
+
+
+@router.post("/carica_file_utenze/{id_prg}", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_carica_file_utenze(
+    id_prg: int,
+    file: UploadFile = File(...),
+    differential: bool = Query(False),
+    current_user: dict = Depends(get_current_user)
+):
+    """Import the utilities Excel file in the background"""
+    is_valid, message = validate_uploaded_file(file)
+    if not is_valid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"status": "error", "message": message}
+        )
+    
+    # The upload is closed with the request: move it to a buffer owned by the job
+    await file.seek(0)
+    buffer = spool_upload(file.file)
+    filename = file.filename
+    
+    async def run(progress):
+        try:
+            async with AsyncSessionLocal() as db:
+                return await process_excel_file(
+                    db, id_prg, buffer, progress=progress,
+                    differential=differential, filename=filename
+                )
+        finally:
+            buffer.close()
+    
+    return job_manager.submit("carica_file_utenze", run, current_user["username"]).to_dict()
+
+
+@router.post("/genera_schema", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_genera_schema(
+    data: dict = Body(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """Generate the electrical schema CSV in the background"""
+    id_prg = data.get("id_prg")
+    if not id_prg:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ID progetto (id_prg) è obbligatorio"
+        )
+    
+    async def run(progress):
+        return await genera_schema_csv(id_prg, progress=progress)
+    
+    return job_manager.submit("genera_schema", run, current_user["username"]).to_dict()
+
+
+@router.post("/preelabora_utenze", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_preelabora_utenze(
+    data: dict = Body(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """Expand the unprocessed utilities of a project into I/O signals in the background"""
+    id_prg = data.get("id_prg")
+    if not id_prg:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ID progetto (id_prg) è obbligatorio"
+        )
+    
+    async def run(progress):
+        return await preelabora_utenze(id_prg, progress=progress)
+    
+    return job_manager.submit("preelabora_utenze", run, current_user["username"]).to_dict()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get status and progress counters of a job"""
+    return get_user_job(job_id, current_user).to_dict()
+
+
+@router.get("/{job_id}/result", response_model=JobResultResponse)
+async def get_job_result(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get the result of a finished job"""
+    job = get_user_job(job_id, current_user)
+    if job.status not in FINISHED_STATES:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job not finished yet (status: {job.status})"
+        )
+    return {"id": job.id, "status": job.status, "result": job.result, "error": job.error}
+
+
+@router.delete("/{job_id}", response_model=JobResponse)
+async def cancel_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Cancel a queued or running job"""
+    get_user_job(job_id, current_user)
+    return job_manager.cancel(job_id).to_dict()
@@ -1,24 +1,33 @@
 """
 Legacy routes for backward compatibility
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Request, UploadFile, File, Form, Body
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Request, UploadFile, File, Form, Body, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
 import os
-import shutil
-import uuid
+import json
+import asyncio
 from datetime import datetime
+from tempfile import SpooledTemporaryFile
 import logging
-from core.database import get_db
+from core.database import get_db, AsyncSessionLocal
 from core.security import get_current_user
-from scripts.carica_file_utenze_mock_alchemy import process_excel_file, validate_uploaded_file
+from scripts.carica_file_utenze_mock_alchemy import (
+    process_excel_file, validate_uploaded_file, validate_excel_file, spool_upload
+)
 from models.utility import Utenza, Potenza
 from models.project import Project, Node
 from sqlalchemy import select, text, func, update
 from models import Hardware, HardwareNode
 from models.legacy import NodiPrg
 from scripts.crea_nodo_alchemy import crea_nodo_plc_automatico
+from scripts.genera_schema_alchemy import genera_schema_csv, stream_schema_csv
+from scripts.preelabora_utenze_alchemy import preelabora_utenze as preelabora_utenze_progetto
+from scripts.export_io_alchemy import (
+    IO_EXPORT_FILES, load_export_project, stream_io_xml, stream_io_json, export_io_file
+)
+from core.export_store import export_store
 from models import IO
 
 router = APIRouter(tags=["legacy"])
@@ -26,9 +35,33 @@ router = APIRouter(tags=["legacy"])
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Upload folder configuration
-UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+def upload_success_response(id_prg: int, filename: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Response of a successful utilities upload"""
+    return {
+        "status": "success",
+        "message": result["message"],
+        "data": {
+            "projectId": id_prg,
+            "fileName": filename,
+            "utilitiesImported": result.get("count", 0),
+            "uploadedAt": datetime.now().isoformat()
+        }
+    }
+
+
+def upload_error_detail(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Error detail of a failed utilities upload"""
+    return {
+        "status": "error",
+        "message": result["message"],
+        "errors": result.get("errors", [])
+    }
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 
 def check_existing_utilities(db: AsyncSession, project_id: int) -> bool:
     """Check if utilities exist for the given project"""
@@ -37,10 +70,136 @@ def check_existing_utilities(db: AsyncSession, project_id: int) -> bool:
     )
     return result.scalar() is not None
 
+async def stream_carica_file_utenze(
+    id_prg: int,
+    buffer: SpooledTemporaryFile,
+    filename: str,
+    differential: bool
+):
+    """
+    Run the utilities import and yield its progress as Server-Sent Events:
+    "progress" events with the counters of each phase, then one "result" (same
+    payload as /carica_file_utenze) or "error" event. The import is cancelled
+    if the client disconnects.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    async def run():
+        try:
+            # The request's session is released before the body is streamed
+            async with AsyncSessionLocal() as db:
+                return await process_excel_file(
+                    db, id_prg, buffer, progress=lambda **counters: queue.put_nowait(counters),
+                    differential=differential, filename=filename
+                )
+        finally:
+            buffer.close()
+    
+    task = asyncio.create_task(run())
+    try:
+        while not task.done() or not queue.empty():
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                yield format_sse("progress", getter.result())
+            else:
+                getter.cancel()
+        
+        try:
+            result = task.result()
+        except Exception as e:
+            logger.error(f"Errore durante l'elaborazione del caricamento del file: {str(e)}", exc_info=True)
+            result = {"success": False, "message": f"Errore durante l'elaborazione del file: {str(e)}"}
+        
+        if result["success"]:
+            yield format_sse("result", upload_success_response(id_prg, filename, result))
+        else:
+            yield format_sse("error", upload_error_detail(result))
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+@router.post("/progetti/{id_prg}/carica_file_utenze/stream")
+async def route_carica_file_utenze_stream(
+    id_prg: int,
+    file: UploadFile = File(...),
+    differential: bool = Query(False),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Variante di /carica_file_utenze che trasmette l'avanzamento come
+    Server-Sent Events (text/event-stream).
+    
+    Args:
+        id_prg: ID del progetto a cui associare le utenze
+        file: Il file Excel da caricare
+        differential: Aggiorna solo le utenze modificate invece di sostituirle tutte
+    """
+    is_valid, message = validate_uploaded_file(file)
+    if not is_valid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"status": "error", "message": message}
+        )
+    
+    # The upload is closed before the body is streamed: move it to a buffer
+    # owned by the import
+    await file.seek(0)
+    buffer = spool_upload(file.file)
+    
+    return StreamingResponse(
+        stream_carica_file_utenze(id_prg, buffer, file.filename, differential),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/progetti/{id_prg}/valida_file_utenze")
+async def route_valida_file_utenze(
+    id_prg: int,
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Valida il file delle utenze senza importarlo.
+    
+    Returns:
+        dict: Numero di righe e report degli errori per riga
+    """
+    is_valid, message = validate_uploaded_file(file)
+    if not is_valid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"status": "error", "message": message}
+        )
+    
+    try:
+        await file.seek(0)
+        with spool_upload(file.file) as buffer:
+            rows_count, errors = await validate_excel_file(buffer, file.filename)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"status": "error", "message": f"File Excel non valido: {e}"}
+        )
+    finally:
+        await file.close()
+    
+    return {
+        "status": "success" if not errors else "error",
+        "data": {
+            "projectId": id_prg,
+            "fileName": file.filename,
+            "rows": rows_count,
+            "errors": errors
+        }
+    }
+
 @router.post("/progetti/{id_prg}/carica_file_utenze")
 async def route_carica_file_utenze(
     id_prg: int,
     file: UploadFile = File(...),
+    differential: bool = Query(False),
     current_user: dict = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -50,6 +209,7 @@ async def route_carica_file_utenze(
     Args:
         id_prg: ID del progetto a cui associare le utenze
         file: Il file Excel da caricare
+        differential: Aggiorna solo le utenze modificate invece di sostituirle tutte
         
     Returns:
         dict: Risposta standardizzata con stato e dati
@@ -76,43 +236,21 @@ async def route_carica_file_utenze(
                 }
             )
         
-        # Generate unique filename
-        file_ext = os.path.splitext(file.filename)[1]
-        unique_filename = f"{uuid.uuid4().hex}{file_ext}"
-        file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-        
-        # Save the file temporarily
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Process the Excel file using SQLAlchemy ORM
-        result = await process_excel_file(db, id_prg, file_path)
-        
-        # Clean up the temporary file
-        try:
-            os.remove(file_path)
-        except OSError:
-            logger.warning(f"Could not remove temporary file: {file_path}")
+        # Parse from a buffer spooled with our own threshold (in memory up to
+        # settings.upload_spool_max_size, a self-deleting temp file above it)
+        await file.seek(0)
+        with spool_upload(file.file) as buffer:
+            result = await process_excel_file(
+                db, id_prg, buffer, differential=differential, filename=file.filename
+            )
         
         if not result["success"]:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail={
-                    "status": "error",
-                    "message": result["message"]
-                }
+                detail=upload_error_detail(result)
             )
         
-        return {
-            "status": "success",
-            "message": result["message"],
-            "data": {
-                "projectId": id_prg,
-                "fileName": file.filename,
-                "utilitiesImported": result.get("count", 0),
-                "uploadedAt": datetime.now().isoformat()
-            }
-        }
+        return upload_success_response(id_prg, file.filename, result)
         
     except HTTPException:
         raise
@@ -125,6 +263,8 @@ async def route_carica_file_utenze(
                 "message": f"Errore durante l'elaborazione del file: {str(e)}"
             }
         )
+    finally:
+        await file.close()
 
 @router.get("/download_template")
 async def download_template():
@@ -574,22 +714,40 @@ async def conferma(
 
 @router.post("/preelabora_utenze")
 async def preelabora_utenze(
-    current_user: dict = Depends(get_current_user)
+    data: dict = Body(...),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Pre-process all utilities"""
+    """Pre-process all unprocessed utilities of a project into I/O signals"""
+    id_prg = data.get("id_prg")
+    if not id_prg:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ID progetto (id_prg) è obbligatorio"
+        )
+    
     try:
-        # Mock pre-processing - in real implementation, this would process all utilities
-        return {
-            "status": "success",
-            "message": "Pre-elaborazione completata per tutte le utenze"
-        }
-        
+        result = await preelabora_utenze_progetto(id_prg, db)
     except Exception as e:
         logger.error(f"Error pre-processing utilities: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error pre-processing utilities"
         )
+    
+    if not result["success"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=result["message"]
+        )
+    
+    return {
+        "status": "success",
+        "message": result["message"],
+        "utilities_processed": result["utilities_processed"],
+        "io_created": result["io_created"],
+        "io_deleted": result["io_deleted"]
+    }
 
 @router.post("/reset_opzione")
 async def reset_opzione(
@@ -816,8 +974,12 @@ async def crea_plc_automatico(
         return {"error": "ID progetto non trovato"}
     
     try:
-        # Pass the database session to the function
-        result = await crea_nodo_plc_automatico(id_prg)
+        result = await crea_nodo_plc_automatico(
+            id_prg,
+            group_by_zona=bool(data.get("group_by_zona", False)),
+            max_slots_per_rack=data.get("max_slots_per_rack"),
+            max_io_per_cpu=data.get("max_io_per_cpu")
+        )
         
         if not result.get("success"):
             logger.error(f"PLC creation failed: {result.get('message')}")
@@ -873,7 +1035,10 @@ async def hw_nodo_add(
             quantita=quantita
         )
         db.add(hw_node)
+        # Manual change: the automatic configuration must be rebuilt next time
+        await db.execute(update(Node).where(Node.id_nodo == id_nodo).values(config_hash=None))
         await db.commit()
+        export_store.invalidate(id_prg)
         await db.refresh(hw_node)
         
         return {"message": "Hardware aggiunto al nodo", "id_nodo_hw": hw_node.id_nodo_hw}
@@ -895,6 +1060,7 @@ async def hw_nodo_delete(
             return {"error": "Record non trovato"}
         
         id_nodo = record.id_nodo
+        id_prg = record.id_prg
         deleted_slot = record.slot
         
         # Delete the record
@@ -906,8 +1072,11 @@ async def hw_nodo_delete(
             .where(HardwareNode.id_nodo == id_nodo, HardwareNode.slot > deleted_slot)
             .values(slot=HardwareNode.slot - 1)
         )
+        # Manual change: the automatic configuration must be rebuilt next time
+        await db.execute(update(Node).where(Node.id_nodo == id_nodo).values(config_hash=None))
         
         await db.commit()
+        export_store.invalidate(id_prg)
         return {"message": "Hardware rimosso dal nodo", "id_nodo_hw": id_nodo_hw}
     except Exception as e:
         logger.error(f"Errore in hw_nodo_delete: {e}")
@@ -924,7 +1093,7 @@ async def export_io_get(
     Export I/O data for a project in specified format (GET method).
     
     Query Parameters:
-        - format: Export format (default: "xml", options: "xml", "json")
+        - format: Export format (default: "xml", options: "xml", "json", "xlsx")
         - id_prg: Project ID (required)
         
     Returns:
@@ -937,116 +1106,16 @@ async def export_io_get(
         format_type = format.lower()
         
         # Verify project exists
-        result = await db.execute(
-            select(Project).where(Project.id_prg == id_prg)
-        )
-        project = result.scalars().first()
+        project = await load_export_project(db, id_prg)
         
         if not project:
             return {"error": "Progetto non trovato"}
         
-        # Create export directory
-        import os
-        base_path = os.getcwd()
-        export_dir = os.path.join(base_path, "export_files")
-        os.makedirs(export_dir, exist_ok=True)
-        
-        if format_type == "xml":
-            # Get I/O data using SQLAlchemy ORM
-            result = await db.execute(
-                select(IO).where(IO.id_prg == id_prg).order_by(IO.id_io)
-            )
-            io_data = result.scalars().all()
-            
-            # Generate XML content
-            xml_content = f"""<?xml version="1.0" encoding="UTF-8"?>
-<IOExport progetto="{id_prg}" nome_progetto="{project.nome_progetto}">
-    <ProjectInfo>
-        <ID>{project.id_prg}</ID>
-        <Name>{project.nome_progetto}</Name>
-        <Description>{project.descrizione or ''}</Description>
-        <CreatedAt>{project.data_creazione}</CreatedAt>
-    </ProjectInfo>
-    <IOData>"""
-            
-            # Add I/O signals
-            for io in io_data:
-                xml_content += f"""
-        <Signal name="{io.codice}" type="{io.tipo}" description="{io.descrizione or ''}"/>"""
-            
-            xml_content += """
-    </IOData>
-</IOExport>"""
-            
-            # Write to file
-            file_path = os.path.join(export_dir, "export_io.xml")
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(xml_content)
-            
-            return {
-                "message": "Export XML generato con successo",
-                "file": "export_io.xml",
-                "project_id": id_prg,
-                "io_count": len(io_data)
-            }
-            
-        elif format_type == "json":
-            # Get comprehensive data for JSON export
-            result = await db.execute(
-                select(IO).where(IO.id_prg == id_prg).order_by(IO.id_io)
-            )
-            io_data = result.scalars().all()
-            
-            result = await db.execute(
-                select(Node).where(Node.id_prg == id_prg).order_by(Node.id_nodo)
-            )
-            nodes_data = result.scalars().all()
-            
-            # Convert to dictionaries
-            export_data = {
-                "project": {
-                    "id_prg": project.id_prg,
-                    "nome_progetto": project.nome_progetto,
-                    "descrizione": project.descrizione,
-                    "data_creazione": str(project.data_creazione)
-                },
-                "io_data": [
-                    {
-                        "id_io": io.id_io,
-                        "codice": io.codice,
-                        "descrizione": io.descrizione,
-                        "tipo": io.tipo,
-                        "id_prg": io.id_prg
-                    } for io in io_data
-                ],
-                "nodes": [
-                    {
-                        "id_nodo": node.id_nodo,
-                        "nome_nodo": node.nome_nodo,
-                        "tipo_nodo": node.tipo_nodo,
-                        "descrizione": node.descrizione,
-                        "id_prg": node.id_prg
-                    } for node in nodes_data
-                ],
-                "exported_at": str(datetime.utcnow()),
-                "exported_by": current_user.get("username", "unknown")
-            }
-            
-            import json
-            file_path = os.path.join(export_dir, "export_io.json")
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(export_data, f, indent=2, ensure_ascii=False)
-            
-            return {
-                "message": "Export JSON generato con successo",
-                "file": "export_io.json",
-                "project_id": id_prg,
-                "io_count": len(io_data),
-                "nodes_count": len(nodes_data)
-            }
-            
-        else:
+        if format_type not in IO_EXPORT_FILES:
             return {"error": f"Formato non supportato: {format_type}"}
+        
+        # Reuse the stored artifact if the project data did not change
+        return await export_io_file(db, project, format_type)
     
     except Exception as e:
         logger.error(f"Errore nell'export I/O: {e}")
@@ -1065,7 +1134,7 @@ async def export_io_post(
     
     Request Body:
         - id_prg: Project ID (required)
-        - format: Export format (optional, default: "xml", options: "xml", "json")
+        - format: Export format (optional, default: "xml", options: "xml", "json", "xlsx")
         
     Returns:
         JSONResponse: Export result with file information and status code
@@ -1081,10 +1150,7 @@ async def export_io_post(
             )
         
         # Verify project exists
-        result = await db.execute(
-            select(Project).where(Project.id_prg == id_prg)
-        )
-        project = result.scalars().first()
+        project = await load_export_project(db, id_prg)
         
         if not project:
             return JSONResponse(
@@ -1092,121 +1158,15 @@ async def export_io_post(
                 content={"status": 404, "error": "Progetto non trovato"}
             )
         
-        # Create export directory
-        import os
-        base_path = os.getcwd()
-        export_dir = os.path.join(base_path, "export_files")
-        os.makedirs(export_dir, exist_ok=True)
-        
-        if format_type == "xml":
-            # Get I/O data using SQLAlchemy ORM
-            result = await db.execute(
-                select(IO).where(IO.id_prg == id_prg).order_by(IO.id_io)
-            )
-            io_data = result.scalars().all()
-            
-            # Generate XML content
-            xml_content = f"""<?xml version="1.0" encoding="UTF-8"?>
-<IOExport progetto="{id_prg}" nome_progetto="{project.nome_progetto}">
-    <ProjectInfo>
-        <ID>{project.id_prg}</ID>
-        <Name>{project.nome_progetto}</Name>
-        <Description>{project.descrizione or ''}</Description>
-        <CreatedAt>{project.data_creazione}</CreatedAt>
-    </ProjectInfo>
-    <IOData>"""
-            
-            # Add I/O signals
-            for io in io_data:
-                xml_content += f"""
-        <Signal name="{io.codice}" type="{io.tipo}" description="{io.descrizione or ''}"/>"""
-            
-            xml_content += """
-    </IOData>
-</IOExport>"""
-            
-            # Write to file
-            file_path = os.path.join(export_dir, "export_io.xml")
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(xml_content)
-            
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "status": 200,
-                    "message": "Export XML generato con successo",
-                    "file": "export_io.xml",
-                    "project_id": id_prg,
-                    "io_count": len(io_data)
-                }
-            )
-            
-        elif format_type == "json":
-            # Get I/O data
-            result = await db.execute(
-                select(IO).where(IO.id_prg == id_prg).order_by(IO.id_io)
-            )
-            io_data = result.scalars().all()
-            
-            # Get nodes data
-            result = await db.execute(
-                select(Node).where(Node.id_prg == id_prg).order_by(Node.id_nodo)
-            )
-            nodes_data = result.scalars().all()
-            
-            # Prepare export data
-            export_data = {
-                "project": {
-                    "id_prg": project.id_prg,
-                    "nome_progetto": project.nome_progetto,
-                    "descrizione": project.descrizione,
-                    "data_creazione": str(project.data_creazione)
-                },
-                "io_data": [
-                    {
-                        "id_io": io.id_io,
-                        "codice": io.codice,
-                        "descrizione": io.descrizione,
-                        "tipo": io.tipo,
-                        "id_prg": io.id_prg
-                    } for io in io_data
-                ],
-                "nodes": [
-                    {
-                        "id_nodo": node.id_nodo,
-                        "nome_nodo": node.nome_nodo,
-                        "tipo_nodo": node.tipo_nodo,
-                        "descrizione": node.descrizione,
-                        "id_prg": node.id_prg
-                    } for node in nodes_data
-                ],
-                "exported_at": str(datetime.utcnow()),
-                "exported_by": current_user.get("username", "unknown")
-            }
-            
-            # Write to file
-            file_path = os.path.join(export_dir, "export_io.json")
-            with open(file_path, "w", encoding="utf-8") as f:
-                import json
-                json.dump(export_data, f, indent=2, ensure_ascii=False)
-            
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "status": 200,
-                    "message": "Export JSON generato con successo",
-                    "file": "export_io.json",
-                    "project_id": id_prg,
-                    "io_count": len(io_data),
-                    "nodes_count": len(nodes_data)
-                }
-            )
-            
-        else:
+        if format_type not in IO_EXPORT_FILES:
             return JSONResponse(
                 status_code=400,
                 content={"status": 400, "error": f"Formato non supportato: {format_type}"}
             )
+        
+        # Reuse the stored artifact if the project data did not change
+        result = await export_io_file(db, project, format_type)
+        return JSONResponse(status_code=200, content={"status": 200, **result})
             
     except Exception as e:
         logger.error(f"Errore in export_io: {e}")
@@ -1216,26 +1176,69 @@ async def export_io_post(
         )
 
 
-@router.get("/download/export_io.xml")
-async def download_export_io():
+@router.get("/export_io/stream")
+async def export_io_stream(
+    id_prg: int,
+    format: str = "xml",
+    indent: bool = False,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
     """
-    Download the generated export_io.xml file.
+    Stream the I/O export of a project as a download, without writing it to disk.
+    
+    Query Parameters:
+        - id_prg: Project ID (required)
+        - format: Export format (default: "xml", options: "xml", "json")
+        - indent: Pretty-print the JSON export (default: compact)
     """
-    import os
-    from fastapi.responses import FileResponse
+    format_type = format.lower()
+    if format_type not in ("xml", "json"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato non supportato: {format_type}"
+        )
     
-    base_path = os.getcwd()
-    export_dir = os.path.join(base_path, "export_files")
-    xml_path = os.path.join(export_dir, "export_io.xml")
+    project = await load_export_project(db, id_prg)
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Progetto non trovato"
+        )
+    
+    if format_type == "json":
+        body, media_type = stream_io_json(project, indent=indent), "application/json"
+    else:
+        body, media_type = stream_io_xml(project), "application/xml"
     
-    if not os.path.exists(xml_path):
+    filename = f"export_io_{id_prg}.{format_type}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+@router.get("/download/export_io.xml")
+async def download_export_io(id_prg: Optional[int] = None):
+    """
+    Download the last generated export_io.xml file of a project.
+    """
+    if not id_prg:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ID progetto (id_prg) è obbligatorio"
+        )
+    
+    path = export_store.latest(id_prg, "export_io.xml")
+    if not path:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File export_io.xml non generato: esegui prima /export_io"
         )
     
     return FileResponse(
-        xml_path,
+        path,
         media_type="application/xml",
         filename="export_io.xml",
         headers={"Content-Disposition": "attachment; filename=export_io.xml"}
@@ -1243,30 +1246,55 @@ async def download_export_io():
 
 
 @router.get("/download/export_io.json")
-async def download_export_io_json():
+async def download_export_io_json(id_prg: Optional[int] = None):
     """
-    Download the generated export_io.json file.
+    Download the last generated export_io.json file of a project.
     """
-    import os
-    from fastapi.responses import FileResponse
-    
-    base_path = os.getcwd()
-    export_dir = os.path.join(base_path, "export_files")
-    json_path = os.path.join(export_dir, "export_io.json")
+    if not id_prg:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ID progetto (id_prg) è obbligatorio"
+        )
     
-    if not os.path.exists(json_path):
+    path = export_store.latest(id_prg, "export_io.json")
+    if not path:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File export_io.json non generato: esegui prima /export_io"
         )
     
     return FileResponse(
-        json_path,
+        path,
         media_type="application/json",
         filename="export_io.json",
         headers={"Content-Disposition": "attachment; filename=export_io.json"}
     )
 
+@router.get("/download/export_io.xlsx")
+async def download_export_io_xlsx(id_prg: Optional[int] = None):
+    """
+    Download the last generated export_io.xlsx file of a project.
+    """
+    if not id_prg:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ID progetto (id_prg) è obbligatorio"
+        )
+    
+    path = export_store.latest(id_prg, "export_io.xlsx")
+    if not path:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File export_io.xlsx non generato: esegui prima /export_io"
+        )
+    
+    return FileResponse(
+        path,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename="export_io.xlsx",
+        headers={"Content-Disposition": "attachment; filename=export_io.xlsx"}
+    )
+
 @router.post("/genera_schema")
 async def genera_schema(
     data: dict = Body(...),
@@ -1288,104 +1316,59 @@ async def genera_schema(
         if not id_prg:
             return {"error": "ID progetto (id_prg) è obbligatorio"}
         
-        # Verify project exists
-        result = await db.execute(
-            select(Project).where(Project.id_prg == id_prg)
-        )
-        project = result.scalars().first()
-        
-        if not project:
-            return {"error": "Progetto non trovato"}
-        
-        # Create export directory
-        import os
-        base_path = os.getcwd()
-        export_dir = os.path.join(base_path, "export_files")
-        os.makedirs(export_dir, exist_ok=True)
-        
-        csv_name = "Schema_elettrico.csv"
-        csv_path = os.path.join(export_dir, csv_name)
-        
-        # Get project data for CSV generation
-        result = await db.execute(
-            select(IO).where(IO.id_prg == id_prg).order_by(IO.id_io)
-        )
-        io_data = result.scalars().all()
-        
-        result = await db.execute(
-            select(Node).where(Node.id_prg == id_prg).order_by(Node.id_nodo)
-        )
-        nodes_data = result.scalars().all()
-        
-        # Generate CSV content
-        import csv
-        rows = [
-            ["Foglio", "Tipo", "Descrizione", "Dettagli"],
-            ["F1", "Legenda", "Legenda simboli", f"Progetto: {project.nome_progetto}"],
-            ["F2", "Potenza", "Motori e carichi", f"ID Progetto: {project.id_prg}"],
-            ["F3", "IO", "Ingressi / Uscite", f"Totale IO: {len(io_data)}"],
-            ["F4", "Nodi", "Nodi di controllo", f"Totale Nodi: {len(nodes_data)}"],
-            ["F5", "Schema", "Schema elettrico completo", f"Generato il: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"]
-        ]
-        
-        # Add IO details
-        for i, io in enumerate(io_data, 1):
-            rows.append([
-                f"IO_{i:03d}",
-                io.tipo,
-                io.descrizione or "",
-                f"Codice: {io.codice}"
-            ])
-        
-        # Add node details
-        for i, node in enumerate(nodes_data, 1):
-            rows.append([
-                f"NODO_{i:03d}",
-                node.tipo_nodo,
-                node.descrizione or "",
-                f"Nome: {node.nome_nodo}"
-            ])
-        
-        # Write CSV file
-        with open(csv_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f, delimiter=";")
-            for row in rows:
-                writer.writerow(row)
-        
-        return {
-            "message": "Schema CSV generato con successo",
-            "file": csv_name,
-            "project_id": id_prg,
-            "io_count": len(io_data),
-            "nodes_count": len(nodes_data),
-            "total_sheets": len(rows)
-        }
+        return await genera_schema_csv(id_prg, db)
         
     except Exception as e:
         logger.error(f"Errore in genera_schema: {e}")
         return {"error": str(e)}
 
 
-@router.get("/download/Schema_elettrico.csv")
-async def download_schema_csv():
+@router.get("/genera_schema/stream")
+async def genera_schema_stream(
+    id_prg: int,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
     """
-    Download the generated Schema_elettrico.csv file.
+    Stream the electrical schema CSV of a project as a download, in one request.
+    
+    Query Parameters:
+        - id_prg: Project ID (required)
     """
-    import os
-    from fastapi.responses import FileResponse
+    project = await load_export_project(db, id_prg)
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Progetto non trovato"
+        )
     
-    base_path = os.getcwd()
-    export_dir = os.path.join(base_path, "export_files")
-    csv_path = os.path.join(export_dir, "Schema_elettrico.csv")
+    return StreamingResponse(
+        stream_schema_csv(project),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=Schema_elettrico.csv"}
+    )
+
+
+@router.get("/download/Schema_elettrico.csv")
+async def download_schema_csv(id_prg: Optional[int] = None):
+    """
+    Download the last generated Schema_elettrico.csv file of a project.
+    """
+    if not id_prg:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ID progetto (id_prg) è obbligatorio"
+        )
     
-    if not os.path.exists(csv_path):
+    path = export_store.latest(id_prg, "Schema_elettrico.csv")
+    if not path:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File Schema_elettrico.csv non generato: esegui prima /genera_schema"
         )
     
     return FileResponse(
-        csv_path,
+        path,
         media_type="text/csv",
         filename="Schema_elettrico.csv",
         headers={"Content-Disposition": "attachment; filename=Schema_elettrico.csv"}
@@ -1,7 +1,7 @@
 """
 Node management routes
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from core.database import get_db
@@ -36,10 +36,11 @@ async def create_node(
 @router.post("/plc/auto/{project_id}")
 async def create_plc_automatically(
     project_id: int,
+    group_by_zona: bool = Query(False),
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Create PLC automatically"""
-    result = await node_service.create_plc_automatically(db, project_id)
+    """Create PLC nodes automatically"""
+    result = await node_service.create_plc_automatically(db, project_id, group_by_zona)
     return result
     
\ No newline at end of file
@@ -2,12 +2,15 @@
 Project management routes
 """
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from core.database import get_db
 from core.security import get_current_user
 from schemas.project import ProjectCreate, ProjectResponse
 from services.project_service import ProjectService
+from scripts.export_io_alchemy import load_export_project
+from scripts.export_bundle_alchemy import stream_export_bundle
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 project_service = ProjectService()
@@ -38,6 +41,32 @@ async def get_project(
     return project
 
 
+@router.get("/{project_id}/export/bundle")
+async def export_project_bundle(
+    project_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream the I/O exports (XML, JSON, XLSX) and the schema CSV of a project as one ZIP.
+
+    The project's rows are cached for the later members and the XLSX workbook
+    is built before it is copied into the archive; both stay in memory up to
+    settings.export_spool_max_size and spill to temp files above it.
+    """
+    project = await load_export_project(db, project_id)
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    return StreamingResponse(
+        stream_export_bundle(project),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=export_progetto_{project_id}.zip"}
+    )
+
+
 @router.post("/", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
 async def create_project(
     project_data: ProjectCreate,
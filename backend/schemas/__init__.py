@@ -4,12 +4,15 @@ Pydantic schemas (DTOs)
 from .auth import LoginRequest, UserResponse, Token
 from .project import ProjectBase, ProjectCreate, ProjectResponse, NodeBase, NodeCreate, NodeResponse
 from .hardware import HardwareResponse, HardwareNodeCreate, HardwareNodeResponse
-from .io import IOBase, IOResponse, IOAssignRequest, IORemoveRequest
+from .job import JobResponse, JobResultResponse
+from .io import IOBase, IOResponse, IOAssignRequest, IORemoveRequest, IOBulkAssignRequest, IOBulkRemoveRequest, IOBulkResponse
 
 __all__ = [
     "LoginRequest", "UserResponse", "Token",
     "ProjectBase", "ProjectCreate", "ProjectResponse", 
     "NodeBase", "NodeCreate", "NodeResponse",
     "HardwareResponse", "HardwareNodeCreate", "HardwareNodeResponse",
-    "IOBase", "IOResponse", "IOAssignRequest", "IORemoveRequest"
+    "IOBase", "IOResponse", "IOAssignRequest", "IORemoveRequest",
+    "IOBulkAssignRequest", "IOBulkRemoveRequest", "IOBulkResponse",
+    "JobResponse", "JobResultResponse"
 ]
\ No newline at end of file
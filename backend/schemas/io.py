@@ -2,7 +2,7 @@
 I/O related schemas
 """
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 
 class IOBase(BaseModel):
@@ -34,6 +34,21 @@ class IORemoveRequest(BaseModel):
     id_modulo: Optional[int] = None
 
 
+class IOBulkAssignRequest(BaseModel):
+    assignments: List[IOAssignRequest]
+
+
+class IOBulkRemoveRequest(BaseModel):
+    assignments: List[IORemoveRequest]
+
+
+class IOBulkResponse(BaseModel):
+    success: bool
+    message: str
+    applied: List[int]
+    conflicts: List[int]
+
+
 class ExportRequest(BaseModel):
     id_prg: int
     format: str = "xml"
@@ -0,0 +1,23 @@
+"""
+Background job schemas
+"""
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    progress: Dict[str, Any] = {}
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+class JobResultResponse(BaseModel):
+    id: str
+    status: str
+    result: Any = None
+    error: Optional[str] = None
@@ -1,191 +1,571 @@
 """
 SQLAlchemy version of assegna_io.py
 Automatically assigns I/O to hardware modules using async SQLAlchemy ORM.
+
+The assignment is set-based: the node's modules (with their catalog capacities
+and current fill) and the project's free I/Os are read with two queries, the
+slot-ordered fill is computed in memory and written back with a single bulk
+UPDATE inside one transaction.
 """
 import logging
 import asyncio
-from typing import Dict, List, Optional, Tuple, AsyncGenerator, Any
-from sqlalchemy import and_, or_, func, select
+from collections import Counter, defaultdict, deque
+from typing import Callable, Dict, List, Optional, Tuple, Any, Iterable
+from sqlalchemy import cast, func, or_, select, update, values, column, Integer, String, Text
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 # Import models and database session
-from models.base import Base
 from models.hardware import Hardware, IO
-from models.project import HardwareNode, Node, Project
-from core.database import get_db as get_async_db
+from models.project import HardwareNode, Node
+from core.config import settings
+from core.database import AsyncSessionLocal
+from core.export_store import export_store
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    """Get async database session"""
-    async for session in get_async_db():
-        yield session
+# Module type (t_cat_hw.tipo) -> capacity attribute on the Hardware model
+CAPACITY_FIELDS = {
+    "Input Digitale": "DI",
+    "Output Digitale": "DO",
+    "Input Digitale Fail-Safe": "F_DI",
+    "Output Digitale Fail-Safe": "F_DO",
+    "Input Analogico Corrente": "AI",
+    "Input Analogico Tensione": "AI",
+    "Output Analogico Corrente": "AO",
+    "Output Analogico Tensione": "AO",
+}
+
+# I/O position groups, filled in this order; anything else / NULL comes last
+POSITION_PRIORITY = ("interno_quadro", "pulsantiera", "bordo_macchina")
+
+# Rows per UPDATE ... FROM (VALUES ...) statement, keeps bind parameters well
+# below the PostgreSQL protocol limit
+BULK_BATCH_SIZE = 5000
+
 
 def get_module_capacity_field(modulo_tipo: str) -> Optional[str]:
     """Map module type to its capacity field"""
-    if modulo_tipo == "Input Digitale":
-        return "DI"
-    elif modulo_tipo == "Output Digitale":
-        return "DO"
-    elif modulo_tipo == "Input Digitale Fail-Safe":
-        return "F-DI"
-    elif modulo_tipo == "Output Digitale Fail-Safe":
-        return "F-DO"
-    elif modulo_tipo in ("Input Analogico Corrente", "Input Analogico Tensione"):
-        return "AI"
-    elif modulo_tipo in ("Output Analogico Corrente", "Output Analogico Tensione"):
-        return "AO"
-    return None
-
-async def assign_io_to_module(db: AsyncSession, io_id: int, module_id: int) -> bool:
-    """Assign an I/O to a module"""
-    try:
-        result = await db.execute(select(IO).where(IO.id_io == io_id))
-        io = result.scalars().first()
-        if not io:
-            logger.error(f"I/O with ID {io_id} not found")
-            return False
-            
-        io.id_nodo_hw = module_id
-        await db.commit()
-        return True
-        
-    except SQLAlchemyError as e:
-        await db.rollback()
-        logger.error(f"Error assigning I/O {io_id} to module {module_id}: {e}")
-        return False
+    return CAPACITY_FIELDS.get(modulo_tipo)
+
+
+def io_priority_key(io: Dict[str, Any]) -> Tuple[int, int]:
+    """Sort key for free I/Os: position group first, then id_io for stable ordering"""
+    posizione = io.get("posizione")
+    if posizione in POSITION_PRIORITY:
+        group = POSITION_PRIORITY.index(posizione)
+    else:
+        group = len(POSITION_PRIORITY)
+    return group, io["id_io"]
+
+
+async def load_node_modules(
+    db: AsyncSession,
+    id_prg: int,
+    id_nodo: int,
+    use_stored_fill: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Load every module of the node, ordered by slot, together with its catalog
+    type, capacity and the number of I/Os already assigned to it (one query).
+
+    With ``use_stored_fill`` the fill level is read from t_nodo_hw.io_assegnati
+    instead of being recounted from t_io.
+    """
+    if use_stored_fill:
+        assigned_col = func.coalesce(HardwareNode.io_assegnati, 0).label("assigned")
+    else:
+        node_modules = select(HardwareNode.id_nodo_hw).where(HardwareNode.id_nodo == id_nodo)
+        assigned = (
+            select(IO.id_modulo, func.count(IO.id_io).label("assigned"))
+            .where(IO.id_modulo.in_(node_modules))
+            .group_by(IO.id_modulo)
+            .subquery()
+        )
+        assigned_col = func.coalesce(assigned.c.assigned, 0).label("assigned")
+
+    query = (
+        select(
+            HardwareNode.id_nodo_hw,
+            HardwareNode.slot,
+            Hardware.nome_hw,
+            Hardware.tipo,
+            Hardware.DI,
+            Hardware.DO,
+            Hardware.AI,
+            Hardware.AO,
+            Hardware.F_DI,
+            Hardware.F_DO,
+            assigned_col,
+        )
+        .join(Hardware, HardwareNode.id_hw == Hardware.id_hw)
+        .where(
+            HardwareNode.id_prg == id_prg,
+            HardwareNode.id_nodo == id_nodo
+        )
+        .order_by(HardwareNode.slot, HardwareNode.id_nodo_hw)
+    )
+    if not use_stored_fill:
+        query = query.outerjoin(assigned, assigned.c.id_modulo == HardwareNode.id_nodo_hw)
+    result = await db.execute(query)
+
+    modules = []
+    for row in result.all():
+        capacity_field = get_module_capacity_field(row.tipo)
+        capacity = getattr(row, capacity_field) if capacity_field else 0
+        modules.append({
+            "id_nodo_hw": row.id_nodo_hw,
+            "slot": row.slot,
+            "nome_hw": row.nome_hw,
+            "tipo": row.tipo,
+            "capacity": capacity or 0,
+            "assigned": row.assigned,
+        })
+    return modules
+
+
+async def load_free_ios(db: AsyncSession, id_prg: int, tipi: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """Load all unassigned I/Os of the project, optionally only of the given types (one query)"""
+    query = select(IO.id_io, IO.tipo, IO.posizione).where(
+        IO.id_prg == id_prg,
+        IO.id_modulo.is_(None)
+    )
+    if tipi is not None:
+        tipi = list(set(tipi))
+        if not tipi:
+            return []
+        query = query.where(IO.tipo.in_(tipi))
+    result = await db.execute(query)
+    return [
+        {"id_io": row.id_io, "tipo": row.tipo, "posizione": row.posizione}
+        for row in result.all()
+    ]
+
+
+def build_io_queues(free_ios: List[Dict[str, Any]]) -> Dict[str, deque]:
+    """Group free I/O IDs by type, each queue in position-priority order"""
+    queues: Dict[str, deque] = defaultdict(deque)
+    for io in sorted(free_ios, key=io_priority_key):
+        queues[io["tipo"]].append(io["id_io"])
+    return queues
+
+
+def plan_io_assignment(
+    modules: List[Dict[str, Any]],
+    queues: Dict[str, deque]
+) -> Tuple[List[Dict[str, int]], List[Dict[str, Any]]]:
+    """
+    Compute the slot-ordered, position-prioritised fill in memory.
+
+    Modules are filled in slot order; each takes free I/Os of its own type
+    (interno_quadro, pulsantiera, bordo_macchina, then the rest) until its
+    remaining capacity is used up. I/Os are consumed from ``queues``, so
+    planning several nodes against the same queues never hands one I/O out
+    twice.
+
+    Returns:
+        Tuple of (assignments, module_fill) where assignments is a list of
+        {"id_io", "id_modulo"} and module_fill reports per-module counts.
+    """
+    assignments: List[Dict[str, int]] = []
+    module_fill: List[Dict[str, Any]] = []
+
+    for module in modules:
+        remaining = max(0, module["capacity"] - module["assigned"])
+        queue = queues.get(module["tipo"])
+        taken = 0
+        if not module["capacity"]:
+            logger.warning(f"Invalid capacity for module {module['id_nodo_hw']} ({module['tipo']})")
+        while queue and taken < remaining:
+            assignments.append({"id_io": queue.popleft(), "id_modulo": module["id_nodo_hw"]})
+            taken += 1
+
+        module_fill.append({
+            "id_nodo_hw": module["id_nodo_hw"],
+            "slot": module["slot"],
+            "nome_hw": module["nome_hw"],
+            "tipo": module["tipo"],
+            "capacity": module["capacity"],
+            "assigned_before": module["assigned"],
+            "assigned_now": taken,
+            "fill": module["assigned"] + taken,
+        })
+
+    return assignments, module_fill
+
+
+async def apply_io_assignments(db: AsyncSession, assignments: List[Dict[str, Any]]) -> List[int]:
+    """
+    Persist assignments with set-based UPDATE ... FROM (VALUES ...) statements.
+
+    Each assignment carries id_io and id_modulo, plus optional indirizzo and
+    note (kept unchanged when missing). Only rows that are still unassigned
+    (id_modulo IS NULL) are updated, so an I/O taken meanwhile by someone else
+    is left untouched. Module fill levels are adjusted in the same
+    transaction, which the caller owns.
+
+    Returns:
+        IDs of the I/Os actually updated
+    """
+    updated: List[int] = []
+    for start in range(0, len(assignments), BULK_BATCH_SIZE):
+        batch = assignments[start:start + BULK_BATCH_SIZE]
+        data = values(
+            column("id_io", Integer),
+            column("id_modulo", Integer),
+            column("indirizzo", String),
+            column("note", Text),
+            name="data"
+        ).data([
+            (a["id_io"], a["id_modulo"], a.get("indirizzo"), a.get("note"))
+            for a in batch
+        ])
+        result = await db.execute(
+            update(IO)
+            .where(IO.id_io == data.c.id_io, IO.id_modulo.is_(None))
+            .values(
+                id_modulo=data.c.id_modulo,
+                indirizzo=func.coalesce(data.c.indirizzo, IO.indirizzo),
+                note=func.coalesce(data.c.note, IO.note)
+            )
+            .returning(IO.id_io, IO.id_modulo)
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        updated.extend(row.id_io for row in rows)
+        await adjust_fill_levels(db, Counter(row.id_modulo for row in rows))
+    return updated
+
+
+def io_removal_update(removals: List[Dict[str, Any]]):
+    """
+    UPDATE ... FROM (VALUES ...) releasing one batch of I/Os, returning the
+    released id_io and the module each one was released from.
+    """
+    data = values(
+        column("id_io", Integer),
+        column("id_modulo", Integer),
+        name="data"
+    ).data([(r["id_io"], r.get("id_modulo")) for r in removals])
+    # A VALUES column holding only NULLs is typed text by PostgreSQL
+    id_modulo = cast(data.c.id_modulo, Integer)
+    # Self-join so RETURNING can report the module each I/O is released from
+    previous = aliased(IO)
+    return (
+        update(IO)
+        .where(
+            IO.id_io == data.c.id_io,
+            previous.id_io == IO.id_io,
+            IO.id_modulo.is_not(None),
+            or_(id_modulo.is_(None), IO.id_modulo == id_modulo)
+        )
+        .values(id_modulo=None, indirizzo=None)
+        .returning(IO.id_io, previous.id_modulo)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def remove_io_assignments(db: AsyncSession, removals: List[Dict[str, Any]]) -> List[int]:
+    """
+    Clear module and address of many I/Os with set-based UPDATE statements.
+
+    A removal carrying id_modulo only applies while the I/O is still assigned
+    to that module; one with id_io alone releases the I/O from any module.
+    Module fill levels are adjusted in the same transaction, which the caller
+    owns.
+
+    Returns:
+        IDs of the I/Os actually released
+    """
+    released: List[int] = []
+    for start in range(0, len(removals), BULK_BATCH_SIZE):
+        result = await db.execute(io_removal_update(removals[start:start + BULK_BATCH_SIZE]))
+        rows = result.all()
+        released.extend(row[0] for row in rows)
+        await adjust_fill_levels(db, {module: -n for module, n in Counter(row[1] for row in rows).items()})
+    return released
+
+
+async def adjust_fill_levels(db: AsyncSession, deltas: Dict[int, int]) -> None:
+    """Add per-module deltas to t_nodo_hw.io_assegnati (one UPDATE)"""
+    deltas = {module: delta for module, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    data = values(
+        column("id_nodo_hw", Integer),
+        column("delta", Integer),
+        name="data"
+    ).data(list(deltas.items()))
+    await db.execute(
+        update(HardwareNode)
+        .where(HardwareNode.id_nodo_hw == data.c.id_nodo_hw)
+        .values(io_assegnati=func.coalesce(HardwareNode.io_assegnati, 0) + data.c.delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def store_fill_levels(db: AsyncSession, modules: List[Dict[str, Any]]) -> None:
+    """Overwrite t_nodo_hw.io_assegnati with freshly counted fill levels (one UPDATE)"""
+    if not modules:
+        return
+    data = values(
+        column("id_nodo_hw", Integer),
+        column("assigned", Integer),
+        name="data"
+    ).data([(m["id_nodo_hw"], m["assigned"]) for m in modules])
+    await db.execute(
+        update(HardwareNode)
+        .where(HardwareNode.id_nodo_hw == data.c.id_nodo_hw)
+        .values(io_assegnati=data.c.assigned)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _reconcile_module_fill(
+    module_fill: List[Dict[str, Any]],
+    assignments: List[Dict[str, int]],
+    updated: List[int]
+) -> None:
+    """Some I/Os were assigned concurrently: report only what actually landed"""
+    landed = set(updated)
+    per_module: Dict[int, int] = defaultdict(int)
+    for a in assignments:
+        if a["id_io"] in landed:
+            per_module[a["id_modulo"]] += 1
+    for fill in module_fill:
+        fill["assigned_now"] = per_module[fill["id_nodo_hw"]]
+        fill["fill"] = fill["assigned_before"] + fill["assigned_now"]
+
 
-async def assegna_io_automaticamente(id_prg: int, id_nodo: int, db: Optional[AsyncSession] = None) -> Dict[str, Any]:
+def plan_to_diff(
+    assignments: List[Dict[str, Any]],
+    addresses: Dict[int, str]
+) -> Dict[int, Dict[str, Any]]:
+    """Compact diff of a plan: id_io -> {"id_modulo", "indirizzo"}"""
+    return {
+        a["id_io"]: {"id_modulo": a["id_modulo"], "indirizzo": addresses.get(a["id_io"])}
+        for a in assignments
+    }
+
+
+async def assegna_io_automaticamente(
+    id_prg: int,
+    id_nodo: int,
+    db: Optional[AsyncSession] = None,
+    dry_run: bool = False,
+    incremental: bool = False,
+    progress: Optional[Callable[..., None]] = None
+) -> Dict[str, Any]:
     """
     Scans all hardware modules of the node and automatically assigns
-    free I/Os (t_io.id_nodo_hw IS NULL) until each module's capacity is filled.
-    
+    free I/Os (t_io.id_modulo IS NULL) until each module's capacity is filled.
+
     Priority order for module filling is determined by their slot number.
-    
-    For each module, I/Os of the same type (TipoIO) are taken in groups:
+
+    For each module, I/Os of the same type are taken in groups:
     1. interno_quadro
     2. pulsantiera
     3. bordo_macchina
     4. Any other / NULL
-    
+
     Args:
         id_prg: Project ID
         id_nodo: Node ID
         db: Optional database session (if not provided, a new one will be created)
+        dry_run: Only compute the plan and return it as a diff, without writing;
+            the diff carries the addresses genera_indirizzi_io would generate
+            once the plan is applied
+        incremental: Only place the currently unassigned I/Os, trusting the
+            fill levels stored on the modules instead of recounting t_io
+        progress: Optional callback receiving progress counters
     """
     local_db = False
     if db is None:
-        db = await anext(get_db())
+        db = AsyncSessionLocal()
         local_db = True
-        
+
     try:
-        # Get all modules for the node, ordered by slot
-        result = await db.execute(
-            select(HardwareNode)
-            .join(Hardware)
-            .where(
-                HardwareNode.id_prg == id_prg,
-                HardwareNode.id_nodo == id_nodo
-            )
-            .order_by(HardwareNode.slot)
-        )
-        modules = result.scalars().all()
-        
+        if incremental:
+            # Free I/Os first: when nothing new was added the run ends here
+            free_ios = await load_free_ios(db, id_prg)
+            if not free_ios:
+                return {
+                    "success": True,
+                    "message": "No unassigned I/Os to place",
+                    "total_assigned": 0,
+                    "modules": []
+                }
+            modules = await load_node_modules(db, id_prg, id_nodo, use_stored_fill=True)
+        else:
+            modules = await load_node_modules(db, id_prg, id_nodo)
         if not modules:
             return {"success": False, "message": "No hardware modules found for the specified node"}
-            
-        total_assigned = 0
-        
-        for module in modules:
-            # Get module type and capacity
-            result = await db.execute(
-                select(Hardware).where(Hardware.id_hw == module.id_hw)
-            )
-            hw = result.scalars().first()
-            
-            if not hw:
-                logger.warning(f"Hardware not found for module ID {module.id_hw}")
-                continue
-                
-            capacity_field = get_module_capacity_field(hw.tipo_modulo)
-            if not capacity_field:
-                logger.warning(f"Unknown module type: {hw.tipo_modulo}")
-                continue
-                
-            capacity = getattr(hw, capacity_field, 0)
-            if not capacity or capacity <= 0:
-                logger.warning(f"Invalid capacity for module {module.id_hw}")
-                continue
-                
-            logger.info(f"Processing module {hw.nome_hw} (Slot {module.slot}) with capacity {capacity}")
-            
-            # Get count of already assigned I/Os
-            result = await db.execute(
-                select(func.count(IO.id_io)).where(
-                    IO.id_nodo_hw == module.id_nodo_hw
-                )
-            )
-            assigned_count = result.scalar() or 0
-            
-            remaining_capacity = max(0, capacity - assigned_count)
-            
-            if remaining_capacity <= 0:
-                logger.info(f"  Module at slot {module.slot} is already full")
-                continue
-                
-            logger.info(f"  {remaining_capacity} I/Os can be assigned to this module")
-            
-            # Get I/Os to assign, ordered by priority
-            stmt = (
-                select(IO)
-                .where(
-                    IO.id_prg == id_prg,
-                    IO.id_nodo == id_nodo,
-                    IO.id_nodo_hw.is_(None),  # Unassigned I/Os
-                    IO.TipoIO == hw.tipo_modulo  # Same type as module
-                )
-                .order_by(
-                    func.coalesce(IO.posizione, '').desc(),  # NULLs last
-                    IO.id_io  # For consistent ordering
-                )
-                .limit(remaining_capacity)
-            )
-            
-            result = await db.execute(stmt)
-            ios_to_assign = result.scalars().all()
-            
-            if not ios_to_assign:
-                logger.info("  No matching I/Os found to assign")
-                continue
-                
-            # Assign the I/Os
-            for io in ios_to_assign:
-                success = await assign_io_to_module(db, io.id_io, module.id_nodo_hw)
-                if success:
-                    total_assigned += 1
-                    logger.debug(f"  Assigned I/O {io.id_io} to module {module.id_nodo_hw}")
-        
+
+        if not incremental:
+            free_ios = await load_free_ios(db, id_prg, (m["tipo"] for m in modules if m["capacity"]))
+        assignments, module_fill = plan_io_assignment(modules, build_io_queues(free_ios))
+        if progress:
+            progress(phase="planned", modules=len(modules), free_ios=len(free_ios), planned=len(assignments))
+
+        if dry_run:
+            # genera_indirizzi_alchemy builds on this module
+            from scripts.genera_indirizzi_alchemy import plan_assignment_addresses
+            addresses = await plan_assignment_addresses(db, modules, free_ios, assignments)
+            return {
+                "success": True,
+                "dry_run": True,
+                "message": f"Plan computed: {len(assignments)} I/Os would be assigned",
+                "total_planned": len(assignments),
+                "modules": module_fill,
+                "diff": plan_to_diff(assignments, addresses)
+            }
+
+        if not incremental:
+            # A full run recounts every module: resynchronise the stored levels
+            await store_fill_levels(db, modules)
+        updated = await apply_io_assignments(db, assignments)
+        await db.commit()
+        export_store.invalidate(id_prg)
+        if progress:
+            progress(phase="committed", assigned=len(updated))
+
+        total_assigned = len(updated)
+        if total_assigned != len(assignments):
+            _reconcile_module_fill(module_fill, assignments, updated)
+
+        logger.info(f"Assigned {total_assigned} I/Os to {len(modules)} modules of node {id_nodo}")
         return {
             "success": True,
             "message": f"Successfully assigned {total_assigned} I/Os",
-            "total_assigned": total_assigned
+            "total_assigned": total_assigned,
+            "modules": module_fill
         }
-        
+
     except SQLAlchemyError as e:
         logger.error(f"Database error: {e}", exc_info=True)
+        await db.rollback()
+        return {
+            "success": False,
+            "message": f"Database error: {str(e)}"
+        }
+    finally:
         if local_db:
-            await db.rollback()
+            await db.close()
+
+
+async def _load_modules_in_own_session(
+    semaphore: asyncio.Semaphore,
+    id_prg: int,
+    id_nodo: int
+) -> List[Dict[str, Any]]:
+    """Load a node's modules through a dedicated session, bounded by ``semaphore``"""
+    async with semaphore:
+        async with AsyncSessionLocal() as session:
+            return await load_node_modules(session, id_prg, id_nodo)
+
+
+async def assegna_io_progetto(
+    id_prg: int,
+    db: Optional[AsyncSession] = None,
+    max_concurrency: Optional[int] = None,
+    progress: Optional[Callable[..., None]] = None
+) -> Dict[str, Any]:
+    """
+    Automatically assign free I/Os to the modules of every PLC node of a project.
+
+    Module layouts are loaded concurrently, one session per node and at most
+    ``max_concurrency`` at a time. The per-node plans are then drawn, in node
+    order, from one shared pool of free I/Os, so nodes competing for the same
+    unassigned t_io rows never receive the same I/O. All assignments are written
+    with conditional bulk UPDATEs and committed in one transaction.
+
+    Args:
+        id_prg: Project ID
+        db: Optional database session used for the write transaction
+        max_concurrency: Maximum number of nodes loaded at the same time
+        progress: Optional callback receiving progress counters
+    """
+    local_db = False
+    if db is None:
+        db = AsyncSessionLocal()
+        local_db = True
+
+    try:
+        result = await db.execute(
+            select(Node.id_nodo, Node.nome_nodo)
+            .where(Node.id_prg == id_prg, Node.tipo_nodo == "PLC")
+            .order_by(Node.nome_nodo, Node.id_nodo)
+        )
+        nodes = result.all()
+        if not nodes:
+            return {"success": False, "message": "No PLC nodes found for the specified project"}
+
+        semaphore = asyncio.Semaphore(max_concurrency or settings.io_assign_max_concurrency)
+        node_modules = await asyncio.gather(*(
+            _load_modules_in_own_session(semaphore, id_prg, node.id_nodo) for node in nodes
+        ))
+
+        tipi = {m["tipo"] for modules in node_modules for m in modules if m["capacity"]}
+        queues = build_io_queues(await load_free_ios(db, id_prg, tipi))
+
+        all_assignments: List[Dict[str, int]] = []
+        summary = []
+        for node, modules in zip(nodes, node_modules):
+            assignments, module_fill = plan_io_assignment(modules, queues)
+            all_assignments.extend(assignments)
+            summary.append({
+                "id_nodo": node.id_nodo,
+                "nome_nodo": node.nome_nodo,
+                "assignments": assignments,
+                "modules": module_fill,
+            })
+
+        if progress:
+            progress(phase="planned", nodes=len(nodes), planned=len(all_assignments))
+
+        await store_fill_levels(db, [m for modules in node_modules for m in modules])
+        updated = await apply_io_assignments(db, all_assignments)
+        await db.commit()
+        export_store.invalidate(id_prg)
+        if progress:
+            progress(phase="committed", assigned=len(updated))
+
+        total_assigned = len(updated)
+        nodes_summary = []
+        for entry in summary:
+            if total_assigned != len(all_assignments):
+                _reconcile_module_fill(entry["modules"], entry["assignments"], updated)
+            nodes_summary.append({
+                "id_nodo": entry["id_nodo"],
+                "nome_nodo": entry["nome_nodo"],
+                "total_assigned": sum(m["assigned_now"] for m in entry["modules"]),
+                "modules": entry["modules"],
+            })
+
+        logger.info(f"Assigned {total_assigned} I/Os across {len(nodes)} nodes of project {id_prg}")
+        return {
+            "success": True,
+            "message": f"Successfully assigned {total_assigned} I/Os across {len(nodes)} nodes",
+            "total_assigned": total_assigned,
+            "conflicts": len(all_assignments) - total_assigned,
+            "nodes": nodes_summary
+        }
+
+    except SQLAlchemyError as e:
+        logger.error(f"Database error: {e}", exc_info=True)
+        await db.rollback()
         return {
             "success": False,
             "message": f"Database error: {str(e)}"
         }
     finally:
-        if local_db and db:
+        if local_db:
             await db.close()
 
+
 async def main():
     """Example usage"""
     # Example: Assign I/Os for project 1, node 1
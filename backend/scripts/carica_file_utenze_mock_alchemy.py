@@ -1,16 +1,28 @@
 """
 SQLAlchemy version of carica_file_utenze_mock.py
 
-• Reads the Excel file
+• Streams the Excel file (openpyxl read-only) and inserts it in fixed-size batches
+• Every row is validated in a streaming pass before any database work (per-row error report)
+• Parsing runs in a thread or process pool, off the event loop
+• Differential mode keys rows by nome_utenza and only writes what changed
 • Inserts rows into t_utenza and (if potenza>0) t_potenza using SQLAlchemy
 • NO avviamento, NO PLC creation, NO IO auto-assign
 """
 import os
+import json
+import shutil
+import asyncio
+import hashlib
 import logging
 import pandas as pd
-from typing import Dict, Any, Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+from io import BytesIO
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from openpyxl import load_workbook
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import cast, func, select, insert, update, delete, exists, values, column, Integer, Float, String, Text
 from sqlalchemy.exc import SQLAlchemyError
 
 # Configure logging
@@ -20,34 +32,66 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# A path on disk or a binary file object (e.g. an upload buffer)
+ExcelSource = Union[str, BinaryIO]
+
+# Sheet holding the utilities list
+SHEET_NAME = "FoglioUtenze"
+
 # Required columns in the Excel file
 REQUIRED_COLUMNS = [
     "nome_utenza", "descrizione", "tensione", "zona",
     "DI", "DO", "AI", "AO", "FDI", "FDO", "potenza"
 ]
 
+# Key holding the sheet row number of each parsed row (header is row 1)
+ROW_KEY = "riga"
+
+# Integer I/O counters
+COUNT_COLUMNS = ["DI", "DO", "AI", "AO", "FDI", "FDO"]
+
+# Maximum lengths of the text columns (t_utenza, and t_potenza for power rows)
+MAX_LENGTHS = {"nome_utenza": (255, 50), "tensione": (20, 20), "zona": (100, 50)}
+
+# Columns compared by the differential import (nome_utenza is the key)
+HASHED_COLUMNS = [
+    "descrizione", "categoria", "tensione", "zona",
+    "DI", "DO", "AI", "AO", "FDI", "FDO", "potenza"
+]
+
+# Columns the generated I/Os depend on: only a change to one of them resets
+# elaborata, so edits like a descrizione fix keep the utility's I/Os, with
+# their module assignments and addresses
+IO_COLUMNS = ["categoria", "zona"] + COUNT_COLUMNS
+
 # Import models and database session
 from models.utility import Utenza, Potenza
 from models.project import Project
+from core.config import settings
+from core.export_store import export_store
+from scripts.preelabora_utenze_alchemy import delete_utility_ios
 
 
-def load_excel_file(path: str) -> pd.DataFrame:
+def load_excel_file(path: ExcelSource) -> pd.DataFrame:
     """
     Load and validate the Excel file.
     
+    Only used for legacy .xls files, which openpyxl cannot stream; .xlsx and
+    .xlsm files go through iter_excel_rows.
+    
     Args:
-        path: Path to the Excel file
+        path: Path to the Excel file, or a binary file object
         
     Returns:
         DataFrame containing the loaded data or an empty DataFrame if there's an error
     """
-    if not os.path.exists(path):
+    if isinstance(path, str) and not os.path.exists(path):
         logger.error("Excel file not found: %s", path)
         return pd.DataFrame()
 
     try:
         # Read the Excel file
-        df = pd.read_excel(path, sheet_name="FoglioUtenze")
+        df = pd.read_excel(path, sheet_name=SHEET_NAME)
         
         # Check for missing columns
         missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
@@ -62,22 +106,353 @@ def load_excel_file(path: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-def get_category(row: pd.Series) -> str:
+def _read_header(header_row: Tuple[Any, ...]) -> Dict[str, int]:
+    """
+    Map column names to their index and validate REQUIRED_COLUMNS.
+    
+    Raises:
+        ValueError: If required columns are missing
+    """
+    header = {}
+    for index, name in enumerate(header_row):
+        if isinstance(name, str) and name.strip() and name.strip() not in header:
+            header[name.strip()] = index
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in header]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {missing_columns}")
+    return header
+
+
+def is_xls(source: ExcelSource, filename: Optional[str] = None) -> bool:
+    """Whether the source is a legacy .xls workbook, judged by its file name"""
+    name = filename or (source if isinstance(source, str) else "")
+    return name.lower().endswith(".xls")
+
+
+def iter_excel_rows(path: ExcelSource, filename: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield the rows of the FoglioUtenze sheet as dictionaries.
+    
+    .xlsx/.xlsm files are read with openpyxl in read-only mode, so only the
+    current row is held in memory. Empty rows are skipped; each row carries its
+    sheet row number under ROW_KEY.
+    
+    Args:
+        path: Path to the Excel file, or a binary file object (e.g. an upload buffer)
+        filename: Original file name, used to detect .xls when ``path`` is a file object
+        
+    Raises:
+        ValueError: If the sheet or required columns are missing
+    """
+    if is_xls(path, filename):
+        df = load_excel_file(path)
+        if df.empty:
+            raise ValueError("Invalid or empty Excel file")
+        df = df.astype(object).where(pd.notnull(df), None)
+        for index, record in zip(df.index, df.to_dict("records")):
+            if all(record[col] is None for col in REQUIRED_COLUMNS):
+                continue
+            row = {col: record[col] for col in REQUIRED_COLUMNS}
+            row[ROW_KEY] = index + 2
+            yield row
+        return
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        if SHEET_NAME not in workbook.sheetnames:
+            raise ValueError(f"Sheet '{SHEET_NAME}' not found")
+        rows = workbook[SHEET_NAME].iter_rows(values_only=True)
+        header_row = next(rows, None)
+        if header_row is None:
+            raise ValueError("Invalid or empty Excel file")
+        header = _read_header(header_row)
+        
+        for row_number, values in enumerate(rows, start=2):
+            if not values or all(value is None or value == "" for value in values):
+                continue
+            row = {
+                col: values[index] if index < len(values) else None
+                for col, index in header.items()
+                if col in REQUIRED_COLUMNS
+            }
+            row[ROW_KEY] = row_number
+            yield row
+    finally:
+        workbook.close()
+
+
+def iter_batches(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group an iterable of rows into lists of at most ``size`` rows"""
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _to_int(value: Any) -> int:
+    try:
+        return int(value) if value not in (None, "") else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value) if value not in (None, "") else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _to_str(value: Any) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def get_category(row: Dict[str, Any]) -> str:
     """
     Determine the category based on the 'potenza' value.
     
     Args:
-        row: DataFrame row containing the data
+        row: Row containing the data
         
     Returns:
         'potenza' if potenza > 0, otherwise 'utenza'
     """
-    return "potenza" if (pd.notna(row["potenza"]) and row["potenza"] > 0) else "utenza"
+    return "potenza" if _to_float(row["potenza"]) > 0 else "utenza"
+
+
+def compute_row_hash(row: Dict[str, Any]) -> str:
+    """Hash the imported columns of a normalized row"""
+    payload = json.dumps([row[col] for col in HASHED_COLUMNS], default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def io_signature(row: Any) -> Tuple[Any, ...]:
+    """Values of IO_COLUMNS of a normalized row or a t_utenza row"""
+    return tuple(
+        (row[col] or 0) if col in COUNT_COLUMNS else row[col]
+        for col in IO_COLUMNS
+    )
+
+
+def normalize_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a raw sheet row to column values and add its category and hash"""
+    normalized = {
+        "nome_utenza": _to_str(row["nome_utenza"]),
+        "descrizione": _to_str(row["descrizione"]) or '',
+        "categoria": get_category(row),
+        "tensione": _to_str(row["tensione"]),
+        "zona": _to_str(row["zona"]),
+        "DI": _to_int(row["DI"]),
+        "DO": _to_int(row["DO"]),
+        "AI": _to_int(row["AI"]),
+        "AO": _to_int(row["AO"]),
+        "FDI": _to_int(row["FDI"]),
+        "FDO": _to_int(row["FDO"]),
+        "potenza": _to_float(row["potenza"]),
+    }
+    normalized["row_hash"] = compute_row_hash(normalized)
+    return normalized
+
+
+def _report(errors: List[Dict[str, Any]], df: pd.DataFrame, mask: pd.Series, column: str, message: str) -> None:
+    """Append one error per row selected by ``mask``"""
+    for row, value in zip(df.loc[mask, ROW_KEY], df.loc[mask, column]):
+        errors.append({
+            "row": int(row),
+            "column": column,
+            "value": None if value is None else str(value),
+            "error": message,
+        })
+
+
+def validate_rows(df: pd.DataFrame, seen_names: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Check rows of the sheet with column-wise (vectorised) checks.
+    
+    Args:
+        df: Raw sheet rows, one column per REQUIRED_COLUMNS entry plus ROW_KEY
+        seen_names: nome_utenza values of the rows validated before ``df``;
+            names repeating one of them are duplicates. Updated in place.
+        
+    Returns:
+        Errors sorted by row: {"row", "column", "value", "error"}
+    """
+    errors: List[Dict[str, Any]] = []
+    
+    def numeric(column: str) -> Tuple[pd.Series, pd.Series]:
+        raw = df[column]
+        blank = raw.isna() | (raw.astype(str).str.strip() == "")
+        values = pd.to_numeric(raw.where(~blank), errors="coerce")
+        _report(errors, df, ~blank & values.isna(), column, "not a number")
+        return values, blank
+    
+    for column in COUNT_COLUMNS:
+        values, _ = numeric(column)
+        _report(errors, df, values < 0, column, "must not be negative")
+        _report(errors, df, values.notna() & (values % 1 != 0), column, "must be a whole number")
+    
+    potenza, _ = numeric("potenza")
+    _report(errors, df, potenza < 0, "potenza", "must not be negative")
+    is_power = potenza > 0
+    
+    names = df["nome_utenza"].map(_to_str)
+    _report(errors, df, names.isna(), "nome_utenza", "missing")
+    duplicated = names.duplicated(keep="first")
+    if seen_names is not None:
+        duplicated |= names.isin(seen_names)
+        seen_names.update(names.dropna())
+    _report(errors, df, names.notna() & duplicated, "nome_utenza", "duplicate")
+    
+    for column, (max_length, max_power_length) in MAX_LENGTHS.items():
+        lengths = df[column].map(_to_str).str.len()
+        _report(errors, df, lengths > max_length, column, f"longer than {max_length} characters")
+        _report(
+            errors, df, is_power & (lengths > max_power_length) & (lengths <= max_length),
+            column, f"longer than {max_power_length} characters (power utility)"
+        )
+    
+    errors.sort(key=lambda error: (error["row"], REQUIRED_COLUMNS.index(error["column"])))
+    return errors
+
+
+def validate_excel_source(path: ExcelSource, filename: Optional[str] = None) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Stream the sheet and validate it one batch DataFrame at a time, so only a
+    batch and the set of names seen so far are held in memory. Runs in the
+    parsing executor.
+    
+    Returns:
+        (number of rows, error report)
+    
+    Raises:
+        ValueError: If the sheet or required columns are missing
+    """
+    rows_count = 0
+    errors: List[Dict[str, Any]] = []
+    seen_names: Set[str] = set()
+    for batch in iter_batches(iter_excel_rows(path, filename), settings.utenze_import_batch_size):
+        df = pd.DataFrame.from_records(batch, columns=REQUIRED_COLUMNS + [ROW_KEY])
+        df = df.astype(object).where(pd.notnull(df), None)
+        errors.extend(validate_rows(df, seen_names))
+        rows_count += len(batch)
+    return rows_count, errors
+
+
+async def validate_excel_file(path: ExcelSource, filename: Optional[str] = None) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Validate the sheet off the event loop before any database work. File
+    objects are rewound afterwards so they can be parsed again.
+    
+    Raises:
+        ValueError: If the sheet or required columns are missing
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_parse_executor()
+    source = path
+    if isinstance(executor, ProcessPoolExecutor) and not isinstance(path, str):
+        source = BytesIO(path.read())
+    try:
+        return await loop.run_in_executor(executor, validate_excel_source, source, filename)
+    finally:
+        if not isinstance(path, str):
+            path.seek(0)
+
+
+def parse_excel_batches(
+    path: ExcelSource,
+    batch_size: int,
+    filename: Optional[str] = None
+) -> List[List[Dict[str, Any]]]:
+    """
+    Parse and normalise the whole sheet into batches. Entry point for the
+    process pool, where a generator cannot be shared with the caller.
+    """
+    return [
+        [normalize_row(row) for row in batch]
+        for batch in iter_batches(iter_excel_rows(path, filename), batch_size)
+    ]
+
+
+def _next_normalized_batch(batches: Iterator[List[Dict[str, Any]]]) -> Optional[List[Dict[str, Any]]]:
+    batch = next(batches, None)
+    return [normalize_row(row) for row in batch] if batch else None
+
+
+_parse_executor: Optional[Executor] = None
+
+
+def get_parse_executor() -> Executor:
+    """Return the shared executor used for spreadsheet parsing, creating it on first use"""
+    global _parse_executor
+    if _parse_executor is None:
+        if settings.excel_parse_executor == "process":
+            _parse_executor = ProcessPoolExecutor(max_workers=settings.excel_parse_max_workers)
+        else:
+            _parse_executor = ThreadPoolExecutor(
+                max_workers=settings.excel_parse_max_workers,
+                thread_name_prefix="excel-parse"
+            )
+    return _parse_executor
+
+
+def shutdown_parse_executor() -> None:
+    """Shut down the parsing executor (application shutdown)"""
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=False, cancel_futures=True)
+        _parse_executor = None
+
+
+async def aiter_excel_batches(
+    path: ExcelSource,
+    batch_size: int,
+    filename: Optional[str] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield normalised row batches while parsing runs off the event loop.
+    
+    With the thread pool (default) the sheet is streamed one batch at a time,
+    so memory stays constant. With the process pool the worker parses the
+    whole sheet and sends back all batches at once, trading memory for CPU
+    parallelism across uploads; file objects are read into memory first since
+    they cannot be sent to another process.
+    
+    Raises:
+        ValueError: If the sheet or required columns are missing
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_parse_executor()
+    
+    if isinstance(executor, ProcessPoolExecutor):
+        if not isinstance(path, str):
+            path = BytesIO(path.read())
+        for batch in await loop.run_in_executor(
+            executor, parse_excel_batches, path, batch_size, filename
+        ):
+            yield batch
+        return
+    
+    rows = iter_excel_rows(path, filename)
+    batches = iter_batches(rows, batch_size)
+    try:
+        while True:
+            batch = await loop.run_in_executor(executor, _next_normalized_batch, batches)
+            if batch is None:
+                return
+            yield batch
+    finally:
+        rows.close()
 
 
 async def check_existing_utilities(db: AsyncSession, project_id: int) -> bool:
     """
-    Check if utilities exist for the given project.
+    Check if utilities exist for the given project (EXISTS probe).
     
     Args:
         db: Database session
@@ -86,111 +461,327 @@ async def check_existing_utilities(db: AsyncSession, project_id: int) -> bool:
     Returns:
         True if utilities exist, False otherwise
     """
-    result = await db.execute(select(Utenza).where(Utenza.id_prg == project_id))
-    return len(result.scalars().all()) > 0
+    result = await db.execute(
+        select(exists().where(Utenza.id_prg == project_id))
+    )
+    return bool(result.scalar())
 
 
 async def delete_existing_utilities(db: AsyncSession, project_id: int) -> None:
     """
     Delete all utilities and power entries for the given project.
     
-    Note: Due to the cascade relationship, deleting Utenza will also delete related Potenza entries.
+    Uses set-based DELETE statements (generated I/Os, then t_potenza, then
+    t_utenza) instead of loading the rows for the ORM cascade. Nothing is
+    committed: the caller runs the deletion in the same transaction as the new
+    insert so a re-import is atomic.
     
     Args:
         db: Database session
         project_id: Project ID to delete utilities for
     """
-    try:
-        # Delete all utilities for the project
-        result = await db.execute(select(Utenza).where(Utenza.id_prg == project_id))
-        utilities = result.scalars().all()
-        for utility in utilities:
-            await db.delete(utility)
-        await db.commit()
-        logger.info("Deleted utilities for project %s", project_id)
-        
-    except SQLAlchemyError as e:
-        await db.rollback()
-        logger.error("Error deleting utilities: %s", str(e), exc_info=True)
-        raise
+    project_utilities = select(Utenza.id_utenza).where(Utenza.id_prg == project_id)
+    await delete_utility_ios(db, project_utilities)
+    await db.execute(
+        delete(Potenza)
+        .where(Potenza.id_utenza.in_(project_utilities))
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(
+        delete(Utenza)
+        .where(Utenza.id_prg == project_id)
+        .execution_options(synchronize_session=False)
+    )
+    logger.info("Deleted %d utilities for project %s", result.rowcount, project_id)
+
+
+async def project_exists(db: AsyncSession, project_id: int) -> bool:
+    """Check that the project exists"""
+    result = await db.execute(select(Project.id_prg).where(Project.id_prg == project_id))
+    return result.first() is not None
 
 
-async def insert_utilities(db: AsyncSession, df: pd.DataFrame, project_id: int) -> int:
+def _potenza_values(project_id: int, id_utenza: int, row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id_prg": project_id,
+        "id_utenza": id_utenza,
+        "nome": row["nome_utenza"],
+        "potenza": row["potenza"],
+        "tensione": row["tensione"],
+        "descrizione": row["descrizione"],
+        "zona": row["zona"],
+    }
+
+
+async def insert_utilities_batch(db: AsyncSession, rows: List[Dict[str, Any]], project_id: int) -> int:
     """
-    Insert utilities and power entries into the database.
+    Insert one batch of normalized rows with two bulk statements: a multi-row
+    INSERT ... RETURNING id_utenza into t_utenza, then the t_potenza rows of the
+    power utilities built from the returned ids. The caller owns the
+    transaction.
     
     Args:
         db: Database session
-        df: DataFrame containing the utility data
+        rows: Rows as returned by normalize_row
         project_id: Project ID to associate with the utilities
         
     Returns:
-        Number of utilities inserted, or 0 if there was an error
+        Number of utilities inserted
     """
-    inserted = 0
+    if not rows:
+        return 0
     
-    try:
-        # Verify project exists
-        result = await db.execute(select(Project).where(Project.id_prg == project_id))
-        project = result.scalars().first()
-        if not project:
-            logger.error("Project with ID %s not found", project_id)
-            return 0
-        
-        for _, row in df.iterrows():
-            # Create new utility
-            utility = Utenza(
-                id_prg=project_id,
-                nome_utenza=row["nome_utenza"] if pd.notna(row["nome_utenza"]) else None,
-                descrizione=row["descrizione"] if pd.notna(row["descrizione"]) else '',
-                categoria=row["categoria"],
-                tensione=row["tensione"] if pd.notna(row["tensione"]) else None,
-                zona=row["zona"],
-                DI=row["DI"],
-                DO=row["DO"],
-                AI=row["AI"],
-                AO=row["AO"],
-                FDI=row["FDI"],
-                FDO=row["FDO"],
-                potenza=row["potenza"]
+    result = await db.execute(
+        insert(Utenza).returning(Utenza.id_utenza, sort_by_parameter_order=True),
+        [{"id_prg": project_id, **row} for row in rows]
+    )
+    ids = result.scalars().all()
+    
+    power_rows = [
+        _potenza_values(project_id, id_utenza, row)
+        for id_utenza, row in zip(ids, rows)
+        if row["categoria"] == "potenza"
+    ]
+    if power_rows:
+        await db.execute(insert(Potenza), power_rows)
+    return len(ids)
+
+
+async def load_existing_utilities(
+    db: AsyncSession,
+    project_id: int
+) -> Tuple[Dict[str, Tuple[int, Optional[str], Tuple[Any, ...]]], List[int]]:
+    """
+    Load the key, id, hash and I/O signature of the project's utilities (one query).
+    
+    Returns:
+        (nome_utenza -> (id_utenza, row_hash, io_signature), ids of duplicate names to drop)
+    """
+    result = await db.execute(
+        select(
+            Utenza.id_utenza, Utenza.nome_utenza, Utenza.row_hash,
+            *(getattr(Utenza, col) for col in IO_COLUMNS)
+        )
+        .where(Utenza.id_prg == project_id)
+        .order_by(Utenza.id_utenza)
+    )
+    existing: Dict[str, Tuple[int, Optional[str], Tuple[Any, ...]]] = {}
+    duplicates: List[int] = []
+    for row in result.all():
+        if row.nome_utenza in existing:
+            duplicates.append(row.id_utenza)
+        else:
+            existing[row.nome_utenza] = (row.id_utenza, row.row_hash, io_signature(row._mapping))
+    return existing, duplicates
+
+
+async def load_power_utility_ids(db: AsyncSession, project_id: int) -> Set[int]:
+    """Ids of the project's utilities that have a t_potenza row"""
+    result = await db.execute(
+        select(Potenza.id_utenza).where(Potenza.id_prg == project_id).distinct()
+    )
+    return set(result.scalars().all())
+
+
+async def update_utilities_batch(
+    db: AsyncSession,
+    changes: List[Tuple[int, Dict[str, Any]]],
+    power_ids: Set[int],
+    project_id: int,
+    io_changed: Set[int]
+) -> None:
+    """
+    Apply changed rows with UPDATE ... FROM (VALUES ...) statements.
+    
+    Utilities in ``io_changed`` (one of IO_COLUMNS differs) get elaborata
+    reset so pre-elaboration regenerates their I/Os; the others keep their
+    I/Os as they are. Their t_potenza rows are updated in place, keeping the starter
+    choice; rows that became or stopped being power utilities get their
+    t_potenza row inserted or deleted. ``power_ids`` is kept up to date.
+    """
+    if not changes:
+        return
+    
+    data = values(
+        column("id_utenza", Integer),
+        column("descrizione", Text),
+        column("categoria", String),
+        column("tensione", String),
+        column("zona", String),
+        column("DI", Integer),
+        column("DO", Integer),
+        column("AI", Integer),
+        column("AO", Integer),
+        column("FDI", Integer),
+        column("FDO", Integer),
+        column("potenza", Float),
+        column("row_hash", String),
+        column("elaborata", Integer),
+        name="data"
+    ).data([
+        (
+            id_utenza, *(row[col] for col in HASHED_COLUMNS), row["row_hash"],
+            0 if id_utenza in io_changed else None
+        )
+        for id_utenza, row in changes
+    ])
+    await db.execute(
+        update(Utenza)
+        .where(Utenza.id_utenza == data.c.id_utenza)
+        .values(
+            **{col: data.c[col] for col in HASHED_COLUMNS},
+            row_hash=data.c.row_hash,
+            # A VALUES column holding only NULLs is typed text by PostgreSQL
+            elaborata=func.coalesce(cast(data.c.elaborata, Integer), Utenza.elaborata)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    
+    power_updates = [c for c in changes if c[1]["categoria"] == "potenza" and c[0] in power_ids]
+    power_inserts = [c for c in changes if c[1]["categoria"] == "potenza" and c[0] not in power_ids]
+    power_deletes = [c[0] for c in changes if c[1]["categoria"] != "potenza" and c[0] in power_ids]
+    
+    if power_updates:
+        power_data = values(
+            column("id_utenza", Integer),
+            column("potenza", Float),
+            column("tensione", String),
+            column("descrizione", Text),
+            column("zona", String),
+            name="power_data"
+        ).data([
+            (id_utenza, row["potenza"], row["tensione"], row["descrizione"], row["zona"])
+            for id_utenza, row in power_updates
+        ])
+        await db.execute(
+            update(Potenza)
+            .where(Potenza.id_utenza == power_data.c.id_utenza)
+            .values(
+                potenza=power_data.c.potenza,
+                tensione=power_data.c.tensione,
+                descrizione=power_data.c.descrizione,
+                zona=power_data.c.zona
             )
-            
-            db.add(utility)
-            await db.flush()  # Flush to get the ID
-            
-            # If it's a power utility, create a power entry
-            if row["categoria"] == "potenza" and row["potenza"] > 0:
-                power = Potenza(
-                    id_prg=project_id,
-                    id_utenza=utility.id_utenza,
-                    nome=row["nome_utenza"],
-                    potenza=row["potenza"],
-                    tensione=row["tensione"] if pd.notna(row["tensione"]) else None,
-                    descrizione=row["descrizione"] if pd.notna(row["descrizione"]) else '',
-                    zona=row["zona"] if pd.notna(row["zona"]) else None
-                )
-                db.add(power)
-            
-            inserted += 1
-        
-        await db.commit()
-        logger.info("Inserted %d utilities for project %s", inserted, project_id)
-        return inserted
+            .execution_options(synchronize_session=False)
+        )
+    if power_inserts:
+        await db.execute(
+            insert(Potenza),
+            [_potenza_values(project_id, id_utenza, row) for id_utenza, row in power_inserts]
+        )
+        power_ids.update(id_utenza for id_utenza, _ in power_inserts)
+    if power_deletes:
+        await db.execute(
+            delete(Potenza)
+            .where(Potenza.id_utenza.in_(power_deletes))
+            .execution_options(synchronize_session=False)
+        )
+        power_ids.difference_update(power_deletes)
+
+
+async def delete_utilities_by_id(db: AsyncSession, ids: List[int], batch_size: int) -> None:
+    """Delete utilities with their generated I/Os and power entries by id, in batches"""
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        await delete_utility_ios(db, batch)
+        await db.execute(
+            delete(Potenza)
+            .where(Potenza.id_utenza.in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            delete(Utenza)
+            .where(Utenza.id_utenza.in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def sync_utilities(
+    db: AsyncSession,
+    project_id: int,
+    batches: AsyncIterator[List[Dict[str, Any]]],
+    batch_size: int,
+    progress: Optional[Callable[..., None]] = None
+) -> Dict[str, int]:
+    """
+    Differential import: compare the sheet with the project's utilities by
+    nome_utenza and row hash, then insert new rows, update changed rows and
+    delete rows no longer in the sheet. Unchanged rows are not written, and
+    only rows whose IO_COLUMNS changed are queued for pre-elaboration again.
+    The caller owns the transaction.
+    
+    Returns:
+        Counters: inserted, updated, deleted, unchanged, skipped
+    """
+    existing, duplicates = await load_existing_utilities(db, project_id)
+    power_ids = await load_power_utility_ids(db, project_id)
+    seen: Set[str] = set()
+    stats = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0, "skipped": 0}
+    
+    async for batch in batches:
+        new_rows: List[Dict[str, Any]] = []
+        changes: List[Tuple[int, Dict[str, Any]]] = []
+        io_changed: Set[int] = set()
+        for row in batch:
+            key = row["nome_utenza"]
+            if key is None or key in seen:
+                # Rows without a name or repeating one cannot be matched
+                stats["skipped"] += 1
+                continue
+            seen.add(key)
+            current = existing.get(key)
+            if current is None:
+                new_rows.append(row)
+            elif current[1] != row["row_hash"]:
+                changes.append((current[0], row))
+                if current[2] != io_signature(row):
+                    io_changed.add(current[0])
+            else:
+                stats["unchanged"] += 1
         
-    except SQLAlchemyError as e:
-        await db.rollback()
-        logger.error("Error inserting utilities: %s", str(e), exc_info=True)
-        return 0
+        stats["inserted"] += await insert_utilities_batch(db, new_rows, project_id)
+        await update_utilities_batch(db, changes, power_ids, project_id, io_changed)
+        stats["updated"] += len(changes)
+        if progress:
+            progress(phase="syncing", **stats)
+    
+    removed = [id_utenza for key, (id_utenza, _, _) in existing.items() if key not in seen]
+    removed.extend(duplicates)
+    await delete_utilities_by_id(db, removed, batch_size)
+    stats["deleted"] = len(removed)
+    return stats
 
 
-async def process_excel_file(db: AsyncSession, project_id: int, file_path: str) -> Dict[str, Any]:
+async def _chain_batches(
+    first_batch: List[Dict[str, Any]],
+    batches: AsyncIterator[List[Dict[str, Any]]]
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    yield first_batch
+    async for batch in batches:
+        yield batch
+
+
+async def process_excel_file(
+    db: AsyncSession,
+    project_id: int,
+    file_path: ExcelSource,
+    progress: Optional[Callable[..., None]] = None,
+    differential: bool = False,
+    filename: Optional[str] = None
+) -> Dict[str, Any]:
     """
     Process the Excel file and import utilities into the database.
     
     Args:
         db: Async database session
         project_id: Project ID to associate the utilities with
-        file_path: Path to the Excel file
+        file_path: Path to the Excel file, or a binary file object such as
+            the upload's spooled buffer (read in place, never copied to disk)
+        progress: Optional callback receiving progress counters
+        differential: Only insert, update and delete the rows that changed
+            instead of replacing every utility of the project
+        filename: Original file name, required to detect .xls files when
+            ``file_path`` is a file object
         
     Returns:
         Dictionary containing the result of the operation
@@ -198,24 +789,91 @@ async def process_excel_file(db: AsyncSession, project_id: int, file_path: str)
     
     try:
         # Check if file exists
-        if not os.path.exists(file_path):
+        if isinstance(file_path, str) and not os.path.exists(file_path):
             return {"success": False, "message": f"File not found: {file_path}"}
         
-        # Load and validate Excel file
-        df = load_excel_file(file_path)
-        if df.empty:
+        # Validate every row before touching the database
+        try:
+            rows_count, errors = await validate_excel_file(file_path, filename)
+        except ValueError as e:
+            return {"success": False, "message": f"Invalid or empty Excel file: {e}"}
+        if rows_count == 0:
             return {"success": False, "message": "Invalid or empty Excel file"}
+        if progress:
+            progress(phase="parsed", rows=rows_count)
+            progress(phase="validated", rows=rows_count, errors=len(errors))
+        if errors:
+            return {
+                "success": False,
+                "message": f"Validation failed: {len(errors)} errors in {rows_count} rows",
+                "errors": errors
+            }
         
-        # Add category column
-        df["categoria"] = df.apply(get_category, axis=1)
-        df = df.where(pd.notnull(df), None)
+        if not await project_exists(db, project_id):
+            logger.error("Project with ID %s not found", project_id)
+            return {"success": False, "message": "No utilities were imported"}
         
-        # Check for existing utilities
-        if await check_existing_utilities(db, project_id):
-            await delete_existing_utilities(db, project_id)
+        # Stream the sheet again, now in batches for the database
+        batch_size = settings.utenze_import_batch_size
+        batches = aiter_excel_batches(file_path, batch_size, filename)
+        try:
+            first_batch = await batches.__anext__()
+        except StopAsyncIteration:
+            return {"success": False, "message": "Invalid or empty Excel file"}
+        except ValueError as e:
+            return {"success": False, "message": f"Invalid or empty Excel file: {e}"}
         
-        # Insert utilities
-        count = await insert_utilities(db, df, project_id)
+        if differential:
+            try:
+                stats = await sync_utilities(
+                    db, project_id, _chain_batches(first_batch, batches), batch_size, progress
+                )
+                await db.commit()
+                export_store.invalidate(project_id)
+            except SQLAlchemyError as e:
+                await db.rollback()
+                logger.error("Error synchronizing utilities: %s", str(e), exc_info=True)
+                return {"success": False, "message": "No utilities were imported"}
+            
+            logger.info("Synchronized utilities for project %s: %s", project_id, stats)
+            if progress:
+                progress(phase="synchronized", **stats)
+            return {
+                "success": True,
+                "message": (
+                    f"Utilities synchronized: {stats['inserted']} inserted, "
+                    f"{stats['updated']} updated, {stats['deleted']} deleted"
+                ),
+                "count": stats["inserted"] + stats["updated"] + stats["unchanged"],
+                **stats
+            }
+        
+        # Replace existing utilities and insert the new ones in one transaction,
+        # inserting batch by batch as the parser produces them
+        count = 0
+        try:
+            if await check_existing_utilities(db, project_id):
+                await delete_existing_utilities(db, project_id)
+            if progress:
+                progress(phase="deleted")
+            
+            count += await insert_utilities_batch(db, first_batch, project_id)
+            if progress:
+                progress(phase="inserting", inserted=count)
+            async for batch in batches:
+                count += await insert_utilities_batch(db, batch, project_id)
+                if progress:
+                    progress(phase="inserting", inserted=count)
+            await db.commit()
+            export_store.invalidate(project_id)
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error("Error inserting utilities: %s", str(e), exc_info=True)
+            count = 0
+        else:
+            logger.info("Inserted %d utilities for project %s", count, project_id)
+        if progress:
+            progress(phase="inserted", inserted=count)
         
         if count == 0:
             return {"success": False, "message": "No utilities were imported"}
@@ -231,6 +889,20 @@ async def process_excel_file(db: AsyncSession, project_id: int, file_path: str)
         return {"success": False, "message": f"Error processing file: {str(e)}"}
 
 
+def spool_upload(fileobj: BinaryIO) -> SpooledTemporaryFile:
+    """
+    Copy an upload into a buffer owned by the caller, kept in memory up to
+    settings.upload_spool_max_size and spilled to a self-deleting temp file
+    above it. The upload routes parse from this buffer, so the threshold does
+    not depend on starlette's multipart parser, and it stays valid when the
+    import outlives the request.
+    """
+    buffer = SpooledTemporaryFile(max_size=settings.upload_spool_max_size)
+    shutil.copyfileobj(fileobj, buffer)
+    buffer.seek(0)
+    return buffer
+
+
 def validate_uploaded_file(file_storage) -> Tuple[bool, str]:
     """
     Validate the uploaded file.
@@ -1,14 +1,21 @@
 """
 SQLAlchemy version of crea_nodo.py
 
-Automatically creates a default PLC node called "CPU01" and, based on the IO count in t_io
+Automatically creates PLC nodes called "CPU01".."CPUnn" and, based on the IO count in t_io
 for the given project, inserts the necessary hardware modules into t_hw_nodo using async SQLAlchemy.
+
+Modules are split across CPUs so that no node exceeds the configured number of rack
+slots (plc_max_slots_per_rack) or I/O channels (plc_max_io_per_cpu); optionally every
+zona gets its own CPUs.
 """
+import hashlib
+import json
 import logging
 import math
 import asyncio
-from typing import Dict, Any, Optional, Tuple, List, AsyncGenerator
-from sqlalchemy import func, text, select
+from collections import defaultdict
+from typing import Callable, Dict, Any, Optional, Tuple, List
+from sqlalchemy import func, select, insert, update, delete
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -22,7 +29,9 @@ logger = logging.getLogger(__name__)
 # Import models and database session
 from models.project import Node, HardwareNode
 from models.hardware import Hardware, IO
+from core.config import settings
 from core.database import AsyncSessionLocal
+from core.export_store import export_store
 
 
 class PLCConfigurator:
@@ -51,9 +60,10 @@ class PLCConfigurator:
         "Output Analogico Tensione": "AO4 (0-10V)"
     }
     
+    # Capacity attribute of the Hardware model for each IO type
     CAPACITY_COLUMNS = {
-        "Input Digitale Fail-Safe": "F-DI",
-        "Output Digitale Fail-Safe": "F-DO",
+        "Input Digitale Fail-Safe": "F_DI",
+        "Output Digitale Fail-Safe": "F_DO",
         "Input Digitale": "DI",
         "Output Digitale": "DO",
         "Input Analogico Corrente": "AI",
@@ -62,61 +72,122 @@ class PLCConfigurator:
         "Output Analogico Tensione": "AO"
     }
     
-    def __init__(self, db: AsyncSession):
+    NODE_DESCRIPTION = "Nodo PLC creato automaticamente"
+    
+    def __init__(
+        self,
+        db: AsyncSession,
+        max_slots_per_rack: Optional[int] = None,
+        max_io_per_cpu: Optional[int] = None,
+        group_by_zona: bool = False
+    ):
         self.db = db
-        self.slot_counter = 1
+        self.max_slots_per_rack = max_slots_per_rack or settings.plc_max_slots_per_rack
+        self.max_io_per_cpu = max_io_per_cpu or settings.plc_max_io_per_cpu
+        self.group_by_zona = group_by_zona
     
-    async def get_or_create_plc_node(self, project_id: int) -> Tuple[Node, bool]:
+    @staticmethod
+    def node_name(index: int) -> str:
+        """Name of the index-th (1-based) automatically created CPU"""
+        return f"CPU{index:02d}"
+    
+    async def get_or_create_plc_nodes(self, project_id: int, cpus: List[Dict[str, Any]]) -> Tuple[List[Node], int]:
         """
-        Get an existing PLC node or create a new one if it doesn't exist.
+        Get or create the nodes CPU01..CPUn for the planned CPUs.
+        
+        Existing nodes are reused by name and their hardware modules removed;
+        automatically created nodes that are no longer needed are deleted.
         
         Args:
             project_id: ID of the project
+            cpus: Planned CPUs, as returned by split_into_cpus
             
         Returns:
-            Tuple of (node, is_new) where is_new is True if the node was just created
+            Tuple of (nodes, created) with one node per planned CPU and the
+            number of nodes that were just created
         """
-        node_name = "CPU01"
+        names = [self.node_name(i) for i in range(1, len(cpus) + 1)]
         
-        # Try to find existing node
         result = await self.db.execute(
             select(Node).where(
                 Node.id_prg == project_id,
-                Node.nome_nodo == node_name
+                Node.nome_nodo.like("CPU%")
             )
         )
-        node = result.scalars().first()
+        existing = {}
+        for node in result.scalars().all():
+            existing.setdefault(node.nome_nodo, node)
         
-        if node:
-            logger.info(f"PLC node {node_name} already exists with ID {node.id_nodo}")
-            # Delete existing hardware modules if any
-            result = await self.db.execute(
-                select(HardwareNode).where(
-                    HardwareNode.id_nodo == node.id_nodo
-                )
+        surplus = [
+            node for name, node in existing.items()
+            if name not in names and (node.descrizione or "").startswith(self.NODE_DESCRIPTION)
+        ]
+        reused = [existing[name] for name in names if name in existing]
+        await self.delete_hardware_modules([node.id_nodo for node in reused + surplus])
+        if surplus:
+            logger.info(f"Deleting {len(surplus)} automatically created nodes no longer needed")
+            await self.db.execute(
+                delete(Node)
+                .where(Node.id_nodo.in_([node.id_nodo for node in surplus]))
+                .execution_options(synchronize_session=False)
             )
-            existing_modules = result.scalars().all()
+        
+        nodes = []
+        created = 0
+        for name, cpu in zip(names, cpus):
+            descrizione = self.NODE_DESCRIPTION
+            if cpu["zona"] is not None:
+                descrizione += f" (zona {cpu['zona']})"
             
-            if existing_modules:
-                logger.info(f"Deleting {len(existing_modules)} existing hardware modules")
-                for module in existing_modules:
-                    await self.db.delete(module)
-                await self.db.commit()
-                
-            return node, False
-        else:
-            # Create new PLC node
-            new_node = Node(
-                id_prg=project_id,
-                nome_nodo=node_name,
-                descrizione="Nodo PLC creato automaticamente",
-                tipo_nodo="PLC"
-            )
-            self.db.add(new_node)
-            await self.db.commit()
-            await self.db.refresh(new_node)
-            logger.info(f"Created new PLC node with ID {new_node.id_nodo}")
-            return new_node, True
+            node = existing.get(name)
+            if node:
+                logger.info(f"PLC node {name} already exists with ID {node.id_nodo}")
+                if (node.descrizione or "").startswith(self.NODE_DESCRIPTION):
+                    node.descrizione = descrizione
+            else:
+                node = Node(
+                    id_prg=project_id,
+                    nome_nodo=name,
+                    descrizione=descrizione,
+                    tipo_nodo="PLC"
+                )
+                self.db.add(node)
+                created += 1
+            nodes.append(node)
+        
+        await self.db.flush()
+        return nodes, created
+    
+    async def delete_hardware_modules(self, node_ids: List[int]) -> int:
+        """
+        Delete all hardware modules of the given nodes with one set-based DELETE.
+        
+        I/Os assigned to those modules are released first so the foreign key
+        on t_io.id_modulo does not block the delete.
+        
+        Args:
+            node_ids: IDs of the nodes
+            
+        Returns:
+            Number of modules deleted
+        """
+        if not node_ids:
+            return 0
+        node_modules = select(HardwareNode.id_nodo_hw).where(HardwareNode.id_nodo.in_(node_ids))
+        await self.db.execute(
+            update(IO)
+            .where(IO.id_modulo.in_(node_modules))
+            .values(id_modulo=None, indirizzo=None)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(
+            delete(HardwareNode)
+            .where(HardwareNode.id_nodo.in_(node_ids))
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            logger.info(f"Deleted {result.rowcount} existing hardware modules")
+        return result.rowcount
     
     async def get_io_counts(self, project_id: int) -> Dict[str, int]:
         """
@@ -128,58 +199,85 @@ class PLCConfigurator:
         Returns:
             Dictionary mapping IO types to their counts
         """
-        counts = {}
-        for io_type in self.IO_TYPES:
-            result = await self.db.execute(
-                select(func.count(IO.id_io)).where(
-                    IO.id_prg == project_id,
-                    IO.tipo == io_type
-                )
+        result = await self.db.execute(
+            select(IO.tipo, func.count(IO.id_io))
+            .where(
+                IO.id_prg == project_id,
+                IO.tipo.in_(self.IO_TYPES)
             )
-            count = result.scalar()
-            counts[io_type] = count or 0
+            .group_by(IO.tipo)
+        )
+        found = dict(result.all())
+        counts = {io_type: found.get(io_type, 0) for io_type in self.IO_TYPES}
         
         logger.info(f"IO counts by type: {counts}")
         return counts
     
-    async def configure_hardware_modules(self, project_id: int, node_id: int) -> int:
+    async def get_default_boards(self) -> Dict[str, Hardware]:
         """
-        Configure hardware modules based on IO counts.
+        Resolve all default boards from the catalog with a single query.
+        
+        Returns:
+            Dictionary mapping board names to their catalog entries
+        """
+        result = await self.db.execute(
+            select(Hardware).where(Hardware.nome_hw.in_(set(self.DEFAULT_BOARDS.values())))
+        )
+        boards = {}
+        for hardware in result.scalars().all():
+            boards.setdefault(hardware.nome_hw, hardware)
+        return boards
+    
+    async def get_io_counts_by_zona(self, project_id: int) -> Dict[Optional[str], Dict[str, int]]:
+        """
+        Get the count of IOs for each zona and IO type in the project.
         
         Args:
             project_id: ID of the project
-            node_id: ID of the node to configure
             
         Returns:
-            Number of modules configured
+            Dictionary mapping each zona (None for IOs without one) to its counts by IO type
+        """
+        result = await self.db.execute(
+            select(IO.zona, IO.tipo, func.count(IO.id_io))
+            .where(
+                IO.id_prg == project_id,
+                IO.tipo.in_(self.IO_TYPES)
+            )
+            .group_by(IO.zona, IO.tipo)
+        )
+        counts: Dict[Optional[str], Dict[str, int]] = {}
+        for zona, io_type, count in result.all():
+            counts.setdefault(zona, dict.fromkeys(self.IO_TYPES, 0))[io_type] = count
+        
+        logger.info(f"IO counts by zona and type: {counts}")
+        return counts
+    
+    def plan_modules(self, io_counts: Dict[str, int], boards: Dict[str, Hardware]) -> List[Dict[str, Any]]:
         """
-        io_counts = await self.get_io_counts(project_id)
-        modules_configured = 0
+        Compute the modules needed for the given IO counts.
         
+        Args:
+            io_counts: Dictionary mapping IO types to their counts
+            boards: Default boards by name, as returned by get_default_boards
+            
+        Returns:
+            List of {"io_type", "id_hw", "capacity"}, one entry per module
+        """
+        modules = []
         for io_type in self.IO_TYPES:
             count_io = io_counts.get(io_type, 0)
             if count_io <= 0:
                 continue
                 
             board_name = self.DEFAULT_BOARDS[io_type]
-            capacity_col = self.CAPACITY_COLUMNS[io_type]
-            
-            # Get hardware details
-            result = await self.db.execute(
-                select(Hardware).where(Hardware.nome_hw == board_name)
-            )
-            hardware = result.scalars().first()
+            hardware = boards.get(board_name)
             
             if not hardware:
                 logger.warning(f"Default board {board_name} not found for {io_type}")
                 continue
                 
-            # Get capacity using raw SQL since the column name might contain special characters
-            result = await self.db.execute(
-                text(f'SELECT "{capacity_col}" FROM t_cat_hw WHERE id_hw = :id_hw'),
-                {"id_hw": hardware.id_hw}
-            )
-            capacity = result.scalar()
+            capacity = getattr(hardware, self.CAPACITY_COLUMNS[io_type])
             
             if not capacity or capacity <= 0:
                 logger.warning(f"Invalid capacity for {board_name}")
@@ -190,62 +288,251 @@ class PLCConfigurator:
                 f"→ {io_type}: {count_io} IOs → {num_modules} modules "
                 f"({capacity} per module)"
             )
+            modules.extend(
+                {"io_type": io_type, "id_hw": hardware.id_hw, "capacity": capacity}
+                for _ in range(num_modules)
+            )
+        return modules
+    
+    def split_into_cpus(self, groups: List[Tuple[Optional[str], List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """
+        Distribute modules over CPUs.
+        
+        A new CPU is started when the current one would exceed max_slots_per_rack
+        modules or max_io_per_cpu channels, and for every group (zona).
+        
+        Args:
+            groups: List of (zona, modules) pairs
             
-            # Add hardware modules
-            for _ in range(num_modules):
-                module = HardwareNode(
-                    id_nodo=node_id,
-                    id_hw=hardware.id_hw,
-                    slot=self.slot_counter,
-                    quantita=1
-                )
-                self.db.add(module)
-                self.slot_counter += 1
-                modules_configured += 1
+        Returns:
+            List of {"zona", "modules", "io_capacity"}, one entry per CPU
+        """
+        cpus = []
+        for zona, modules in groups:
+            current = None
+            for module in modules:
+                if (
+                    current is None
+                    or len(current["modules"]) >= self.max_slots_per_rack
+                    or (current["modules"] and current["io_capacity"] + module["capacity"] > self.max_io_per_cpu)
+                ):
+                    current = {"zona": zona, "modules": [], "io_capacity": 0}
+                    cpus.append(current)
+                current["modules"].append(module)
+                current["io_capacity"] += module["capacity"]
+        
+        if not cpus:
+            cpus.append({"zona": None, "modules": [], "io_capacity": 0})
+        return cpus
+    
+    def fingerprint(self, counts: List[Tuple[Optional[str], Dict[str, int]]], boards: Dict[str, Hardware]) -> str:
+        """
+        Hash of everything the configuration depends on: IO counts per zona and
+        type, the default-board catalog rows and the splitting options.
+        
+        Args:
+            counts: List of (zona, counts by IO type) pairs
+            boards: Default boards by name, as returned by get_default_boards
+            
+        Returns:
+            Hex SHA-256 digest
+        """
+        payload = {
+            "counts": [[zona, sorted(type_counts.items())] for zona, type_counts in counts],
+            "boards": sorted(
+                [hw.id_hw, hw.nome_hw, hw.DI, hw.DO, hw.AI, hw.AO, hw.F_DI, hw.F_DO]
+                for hw in boards.values()
+            ),
+            "max_slots_per_rack": self.max_slots_per_rack,
+            "max_io_per_cpu": self.max_io_per_cpu,
+            "group_by_zona": self.group_by_zona
+        }
+        return hashlib.sha256(json.dumps(payload, default=str).encode("utf-8")).hexdigest()
+    
+    async def get_cached_nodes(self, project_id: int, config_hash: str, cpus: List[Dict[str, Any]]) -> Optional[List[Node]]:
+        """
+        Return the nodes CPU01..CPUn if they were configured with the same
+        fingerprint, still hold exactly the planned modules in the planned
+        slots, and no other automatically created CPU exists.
+        
+        Args:
+            project_id: ID of the project
+            config_hash: Fingerprint of the requested configuration
+            cpus: CPUs of the requested configuration, as returned by split_into_cpus
+            
+        Returns:
+            Nodes in name order, or None if the configuration must be rebuilt
+        """
+        names = [self.node_name(i) for i in range(1, len(cpus) + 1)]
+        result = await self.db.execute(
+            select(Node).where(
+                Node.id_prg == project_id,
+                Node.nome_nodo.like("CPU%")
+            )
+        )
+        existing = {node.nome_nodo: node for node in result.scalars().all()}
+        
+        if any(existing.get(name) is None or existing[name].config_hash != config_hash for name in names):
+            return None
+        if any(
+            name not in names and (node.descrizione or "").startswith(self.NODE_DESCRIPTION)
+            for name, node in existing.items()
+        ):
+            return None
         
-        await self.db.commit()
-        return modules_configured
+        nodes = [existing[name] for name in names]
+        result = await self.db.execute(
+            select(HardwareNode.id_nodo, HardwareNode.slot, HardwareNode.id_hw)
+            .where(HardwareNode.id_nodo.in_([node.id_nodo for node in nodes]))
+            .order_by(HardwareNode.id_nodo, HardwareNode.slot, HardwareNode.id_nodo_hw)
+        )
+        installed: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        for row in result.all():
+            installed[row.id_nodo].append((row.slot, row.id_hw))
+        for node, cpu in zip(nodes, cpus):
+            planned = [(slot, module["id_hw"]) for slot, module in enumerate(cpu["modules"], start=1)]
+            if installed[node.id_nodo] != planned:
+                return None
+        return nodes
+    
+    async def configure(self, project_id: int) -> Dict[str, Any]:
+        """
+        Create or update the PLC nodes and configure their hardware modules
+        based on IO counts.
+        
+        When the nodes were already configured from the same IO counts, catalog
+        rows and options, nothing is written and the existing configuration is
+        returned, so module IDs (and the I/O assignments pointing at them) are kept.
+        
+        Args:
+            project_id: ID of the project
+            
+        Returns:
+            Summary with the configured nodes
+        """
+        boards = await self.get_default_boards()
+        if self.group_by_zona:
+            by_zona = await self.get_io_counts_by_zona(project_id)
+            zone = sorted(by_zona, key=lambda zona: (zona is None, zona or ""))
+            counts = [(zona, by_zona[zona]) for zona in zone]
+        else:
+            counts = [(None, await self.get_io_counts(project_id))]
+        
+        groups = [(zona, self.plan_modules(type_counts, boards)) for zona, type_counts in counts]
+        cpus = self.split_into_cpus(groups)
+        config_hash = self.fingerprint(counts, boards)
+        
+        nodes = await self.get_cached_nodes(project_id, config_hash, cpus)
+        cached = nodes is not None
+        if cached:
+            logger.info(f"PLC configuration of project {project_id} unchanged, reusing existing nodes")
+            created = 0
+        else:
+            nodes, created = await self.get_or_create_plc_nodes(project_id, cpus)
+        
+        rows = []
+        summary = []
+        for node, cpu in zip(nodes, cpus):
+            for slot, module in enumerate(cpu["modules"], start=1):
+                rows.append({
+                    "id_nodo": node.id_nodo,
+                    "id_prg": project_id,
+                    "id_hw": module["id_hw"],
+                    "slot": slot,
+                    "quantita": 1,
+                    "io_assegnati": 0
+                })
+            summary.append({
+                "id_nodo": node.id_nodo,
+                "nome_nodo": node.nome_nodo,
+                "zona": cpu["zona"],
+                "modules_configured": len(cpu["modules"]),
+                "io_capacity": cpu["io_capacity"]
+            })
+            if not cached:
+                node.config_hash = config_hash
+        
+        if not cached:
+            # Add all hardware modules with one multi-row INSERT
+            if rows:
+                await self.db.execute(insert(HardwareNode).values(rows))
+            await self.db.commit()
+            export_store.invalidate(project_id)
+        
+        return {
+            "nodes": summary,
+            "modules_configured": len(rows),
+            "nodes_created": created,
+            "cached": cached,
+            "config_hash": config_hash
+        }
 
 
-async def crea_nodo_plc_automatico(project_id: int) -> Dict[str, Any]:
+async def crea_nodo_plc_automatico(
+    project_id: int,
+    db: Optional[AsyncSession] = None,
+    group_by_zona: bool = False,
+    max_slots_per_rack: Optional[int] = None,
+    max_io_per_cpu: Optional[int] = None,
+    progress: Optional[Callable[..., None]] = None
+) -> Dict[str, Any]:
     """
-    Automatically create a PLC node and configure hardware modules based on IO requirements.
+    Automatically create PLC nodes and configure hardware modules based on IO requirements.
+    
+    Node creation, removal of the old modules and insertion of the new ones
+    are committed together.
     """
-    async with AsyncSessionLocal() as db:
-        try:
-            configurator = PLCConfigurator(db)
-
-            node, is_new = await configurator.get_or_create_plc_node(project_id)
-            modules_configured = await configurator.configure_hardware_modules(project_id, node.id_nodo)
+    if db is None:
+        async with AsyncSessionLocal() as db:
+            return await crea_nodo_plc_automatico(
+                project_id, db, group_by_zona, max_slots_per_rack, max_io_per_cpu, progress
+            )
+    
+    try:
+        configurator = PLCConfigurator(
+            db,
+            max_slots_per_rack=max_slots_per_rack,
+            max_io_per_cpu=max_io_per_cpu,
+            group_by_zona=group_by_zona
+        )
+        result = await configurator.configure(project_id)
+        nodes = result["nodes"]
+        if progress:
+            progress(phase="configured", nodes=len(nodes), modules=result["modules_configured"])
 
+        if result["cached"]:
+            message = f"PLC configuration unchanged: {len(nodes)} nodes reused."
+        else:
             message = (
-                f"PLC node created successfully: "
-                f"{'created' if is_new else 'updated'} "
-                f"and {modules_configured} hardware modules configured."
+                f"PLC nodes configured successfully: "
+                f"{len(nodes)} nodes ({result['nodes_created']} created) "
+                f"and {result['modules_configured']} hardware modules configured."
             )
 
-            return {
-                "success": True,
-                "message": message,
-                "node_id": node,
-                "modules_configured": modules_configured,
-                "is_new": is_new
-            }
+        return {
+            "success": True,
+            "message": message,
+            "node_id": nodes[0]["id_nodo"],
+            "modules_configured": result["modules_configured"],
+            "is_new": result["nodes_created"] > 0,
+            "cached": result["cached"],
+            "nodes": nodes
+        }
 
-        except SQLAlchemyError as e:
-            await db.rollback()
-            logger.error(f"Error in automatic PLC node creation: {e}")
-            return {
-                "success": False,
-                "message": f"Error: {str(e)}"
-            }
-        except Exception as e:
-            await db.rollback()
-            logger.error(f"Unexpected error in automatic PLC node creation: {e}")
-            return {
-                "success": False,
-                "message": f"Unexpected error: {str(e)}"
-            }
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error(f"Error in automatic PLC node creation: {e}")
+        return {
+            "success": False,
+            "message": f"Error: {str(e)}"
+        }
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Unexpected error in automatic PLC node creation: {e}")
+        return {
+            "success": False,
+            "message": f"Unexpected error: {str(e)}"
+        }
 
 
 async def main():
@@ -0,0 +1,208 @@
+"""
+Project hand-off bundle: a ZIP archive with the I/O exports (XML, JSON,
+XLSX) and the electrical schema CSV, streamed while it is compressed.
+
+The project data is read in a single pass: t_io (joined with module, node
+and catalog entry) and t_nodo are scanned once through server-side cursors.
+During that pass the XML member is compressed and streamed straight away,
+and every partition is kept as a zlib-compressed orjson blob; the JSON, CSV
+and XLSX members are then produced from those blobs without querying again.
+
+Memory is bounded by settings.export_spool_max_size: the cached partitions
+and the XLSX workbook (which openpyxl can only save to a seekable file) are
+kept in SpooledTemporaryFiles that spill to self-deleting temp files above
+that size. zipfile writes to a non-seekable sink (sizes go in data
+descriptors), which the generator drains after every partition or chunk.
+"""
+import asyncio
+import logging
+import os
+import zipfile
+import zlib
+from collections import namedtuple
+from tempfile import SpooledTemporaryFile
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+import orjson
+from openpyxl import Workbook
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from models.project import Node
+from scripts.export_io_alchemy import (
+    IO_EXPORT_FILES, JSON_IO_COLUMNS, JSON_NODE_COLUMNS, XLSX_COLUMNS, XLSX_SHEET_NAME, XML_FOOTER,
+    in_session, io_module_select, iter_partitions, json_array_separator, json_elements,
+    json_footer, json_header, xml_header, xml_signals
+)
+from scripts.genera_schema_alchemy import (
+    CSV_NAME, csv_chunk, io_schema_rows, node_schema_rows, schema_header_rows
+)
+
+logger = logging.getLogger(__name__)
+
+# Every t_io column needed by one of the members, read in the single pass
+BUNDLE_IO_COLUMNS = list({
+    column.key: column for column in [*JSON_IO_COLUMNS, *(column for _, column in XLSX_COLUMNS)]
+}.values())
+BUNDLE_NODE_COLUMNS = JSON_NODE_COLUMNS
+
+JSON_IO_FIELDS = [column.key for column in JSON_IO_COLUMNS]
+JSON_NODE_FIELDS = [column.key for column in JSON_NODE_COLUMNS]
+XLSX_FIELDS = [column.key for _, column in XLSX_COLUMNS]
+
+# Size of the chunks the XLSX workbook is copied into the archive with
+XLSX_COPY_CHUNK = 1024 * 1024
+
+
+class RowCache:
+    """
+    Rows of one query kept as compressed partitions, replayable without the
+    database. The partitions are in memory up to settings.export_spool_max_size
+    and in a temp file above it.
+    """
+
+    def __init__(self, fields: Sequence[str]):
+        self.row_type = namedtuple("CachedRow", fields)
+        self.count = 0
+        self._file = SpooledTemporaryFile(max_size=settings.export_spool_max_size)
+        self._sizes: List[int] = []
+
+    def add(self, rows: Sequence[Any]) -> None:
+        blob = zlib.compress(orjson.dumps([tuple(row) for row in rows]), 1)
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(blob)
+        self._sizes.append(len(blob))
+        self.count += len(rows)
+
+    def partitions(self) -> Iterator[List[Any]]:
+        self._file.seek(0)
+        for size in self._sizes:
+            blob = self._file.read(size)
+            yield [self.row_type._make(values) for values in orjson.loads(zlib.decompress(blob))]
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ZipSink:
+    """Write-only file object collecting what zipfile writes until it is drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _pick(row: Any, fields: Sequence[str]) -> Dict[str, Any]:
+    return {field: getattr(row, field) for field in fields}
+
+
+async def _read_project(
+    db: AsyncSession,
+    id_prg: int,
+    io_cache: RowCache,
+    node_cache: RowCache
+) -> AsyncIterator[Sequence[Any]]:
+    """The single pass over the database: cache every partition and yield the I/O ones"""
+    async for rows in iter_partitions(db, io_module_select(id_prg, *BUNDLE_IO_COLUMNS)):
+        io_cache.add(rows)
+        yield rows
+    async for rows in iter_partitions(
+        db, select(*BUNDLE_NODE_COLUMNS).where(Node.id_prg == id_prg).order_by(Node.id_nodo)
+    ):
+        node_cache.add(rows)
+
+
+def _build_xlsx(io_cache: RowCache, buffer: SpooledTemporaryFile) -> None:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(XLSX_SHEET_NAME)
+    ws.append([header for header, _ in XLSX_COLUMNS])
+    for rows in io_cache.partitions():
+        for row in rows:
+            ws.append([getattr(row, field) for field in XLSX_FIELDS])
+    wb.save(buffer)
+    buffer.seek(0)
+
+
+async def stream_export_bundle(
+    project: Dict[str, Any],
+    db: Optional[AsyncSession] = None
+) -> AsyncIterator[bytes]:
+    """
+    Yield the ZIP bundle of a project chunk by chunk.
+
+    Args:
+        project: Project fields as returned by load_export_project
+        db: Optional database session; by default a session is opened for the
+            database pass only
+    """
+    sink = _ZipSink()
+    io_cache = RowCache([column.key for column in BUNDLE_IO_COLUMNS])
+    node_cache = RowCache([column.key for column in BUNDLE_NODE_COLUMNS])
+    xlsx = SpooledTemporaryFile(max_size=settings.export_spool_max_size)
+
+    try:
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            # XML, streamed during the database pass
+            with zf.open(IO_EXPORT_FILES["xml"], "w", force_zip64=True) as member:
+                member.write(xml_header(project).encode("utf-8"))
+                async for rows in in_session(
+                    db, lambda db: _read_project(db, project["id_prg"], io_cache, node_cache)
+                ):
+                    member.write(xml_signals(rows).encode("utf-8"))
+                    yield sink.drain()
+                member.write(XML_FOOTER.encode("utf-8"))
+
+            # JSON
+            with zf.open(IO_EXPORT_FILES["json"], "w", force_zip64=True) as member:
+                member.write(json_header(project))
+                for i, rows in enumerate(io_cache.partitions()):
+                    member.write(json_elements([_pick(row, JSON_IO_FIELDS) for row in rows], i == 0))
+                    yield sink.drain()
+                member.write(json_array_separator(b"nodes"))
+                for i, rows in enumerate(node_cache.partitions()):
+                    member.write(json_elements([_pick(row, JSON_NODE_FIELDS) for row in rows], i == 0))
+                member.write(json_footer())
+
+            # Schema CSV
+            with zf.open(CSV_NAME, "w", force_zip64=True) as member:
+                member.write(csv_chunk(
+                    schema_header_rows(project, io_cache.count, node_cache.count)
+                ).encode("utf-8"))
+                offset = 0
+                for rows in io_cache.partitions():
+                    member.write(csv_chunk(io_schema_rows(rows, offset)).encode("utf-8"))
+                    offset += len(rows)
+                    yield sink.drain()
+                offset = 0
+                for rows in node_cache.partitions():
+                    member.write(csv_chunk(node_schema_rows(rows, offset)).encode("utf-8"))
+                    offset += len(rows)
+
+            # XLSX: built into the spooled buffer, then copied chunk by chunk
+            await asyncio.to_thread(_build_xlsx, io_cache, xlsx)
+            with zf.open(IO_EXPORT_FILES["xlsx"], "w", force_zip64=True) as member:
+                while chunk := xlsx.read(XLSX_COPY_CHUNK):
+                    member.write(chunk)
+                    yield sink.drain()
+
+        yield sink.drain()
+    finally:
+        io_cache.close()
+        node_cache.close()
+        xlsx.close()
+
+    logger.info(
+        f"Streamed export bundle of project {project['id_prg']}: "
+        f"{io_cache.count} I/Os, {node_cache.count} nodes"
+    )
@@ -0,0 +1,414 @@
+"""
+Streaming export of project I/O (t_io).
+
+Documents are produced chunk by chunk: the header is emitted before the
+database is queried, t_io is read through a server-side cursor in partitions
+of EXPORT_FETCH_SIZE rows and every partition is formatted into one chunk, so
+memory stays flat regardless of the number of signals. All values are escaped
+as they are written.
+
+The same generators feed StreamingResponse bodies and the file exports,
+which are kept in the export artifact store (core.export_store) under a
+version of the exported project data. Stored artifacts carry no generation
+timestamp, since they are served for as long as the data is unchanged.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime
+import orjson
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+from openpyxl import Workbook
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.hardware import IO, Hardware
+from models.project import Project, Node, HardwareNode
+from core.database import AsyncSessionLocal
+from core.export_store import export_store
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched from the server-side cursor per round-trip (and per chunk)
+EXPORT_FETCH_SIZE = 2000
+
+# Part of every data version: bump when the layout of an export changes so
+# that stored artifacts are regenerated
+EXPORT_FORMAT_VERSION = 4
+
+# Artifact name of each file export format of /export_io
+IO_EXPORT_FILES = {
+    "xml": "export_io.xml",
+    "json": "export_io.json",
+    "xlsx": "export_io.xlsx",
+}
+
+# Fields of the io_data and nodes arrays of the JSON export
+JSON_IO_COLUMNS = [
+    IO.id_io, IO.codice, IO.descrizione, IO.tipo, IO.id_modulo, IO.indirizzo, IO.id_prg
+]
+JSON_NODE_COLUMNS = [
+    Node.id_nodo, Node.nome_nodo, Node.tipo_nodo, Node.descrizione, Node.id_prg
+]
+
+# I/O list sheet of the XLSX export: header -> column of the joined query
+XLSX_SHEET_NAME = "IO"
+XLSX_COLUMNS = [
+    ("Indirizzo", IO.indirizzo),
+    ("CPU", Node.nome_nodo),
+    ("Slot", HardwareNode.slot),
+    ("Modulo", Hardware.nome_hw),
+    ("Blocco Grafico", Hardware.blocco_grafico),
+    ("Codice", IO.codice),
+    ("Tipo", IO.tipo),
+    ("Commento1", IO.descrizione),
+    ("Zona", IO.zona),
+    ("Posizione", IO.posizione),
+]
+
+XML_FOOTER = """
+    </IOData>
+</IOExport>"""
+
+_XML_ATTR_ENTITIES = {'"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#9;"}
+
+
+def xml_text(value: Any) -> str:
+    """Escape a value for XML character data"""
+    return escape("" if value is None else str(value))
+
+
+def xml_attr(value: Any) -> str:
+    """Escape a value for a double-quoted XML attribute"""
+    return escape("" if value is None else str(value), _XML_ATTR_ENTITIES)
+
+
+async def load_export_project(db: AsyncSession, id_prg: int) -> Optional[Dict[str, Any]]:
+    """Load the project fields used by the export headers, or None if it does not exist"""
+    result = await db.execute(select(Project).where(Project.id_prg == id_prg))
+    project = result.scalars().first()
+    if not project:
+        return None
+    return {
+        "id_prg": project.id_prg,
+        "nome_progetto": project.nome_progetto,
+        "descrizione": project.descrizione,
+        "data_creazione": project.data_creazione,
+    }
+
+
+async def iter_partitions(db: AsyncSession, statement) -> AsyncIterator[Sequence[Any]]:
+    """Yield the rows of a select in partitions read from a server-side cursor"""
+    result = await db.stream(statement.execution_options(yield_per=EXPORT_FETCH_SIZE))
+    async for partition in result.partitions():
+        yield partition
+
+
+def iter_io_partitions(db: AsyncSession, id_prg: int, *columns) -> AsyncIterator[Sequence[Any]]:
+    """Yield the project's I/O rows, ordered by id_io, in partitions"""
+    return iter_partitions(
+        db, select(*columns).where(IO.id_prg == id_prg).order_by(IO.id_io)
+    )
+
+
+def version_aggregates(id_prg: int) -> Dict[str, Any]:
+    """
+    Aggregates of the exported tables, computed by the database without
+    transferring rows: any insert or delete, and any (re)assignment of I/Os to
+    modules, changes them.
+    """
+    return {
+        "io": select(
+            func.count(), func.max(IO.id_io),
+            func.count(IO.id_modulo), func.sum(IO.id_modulo), func.count(IO.indirizzo)
+        ).where(IO.id_prg == id_prg),
+        "nodes": select(func.count(), func.max(Node.id_nodo)).where(Node.id_prg == id_prg),
+        "modules": select(
+            func.count(), func.max(HardwareNode.id_nodo_hw), func.sum(HardwareNode.slot)
+        ).where(HardwareNode.id_prg == id_prg),
+    }
+
+
+async def project_data_version(db: AsyncSession, project: Dict[str, Any]) -> Tuple[str, Dict[str, int]]:
+    """
+    Version of the exported data of a project, from a few SQL aggregates.
+
+    Edits that leave the aggregates unchanged (descriptions, addresses, node
+    names, ...) are covered by the write paths, which drop the project's
+    artifacts with export_store.invalidate after committing.
+
+    Returns:
+        Tuple (version hash, row count per table)
+    """
+    digest = hashlib.sha256(
+        json.dumps([EXPORT_FORMAT_VERSION, project], default=str).encode("utf-8")
+    )
+    counts = {}
+    for name, statement in version_aggregates(project["id_prg"]).items():
+        row = (await db.execute(statement)).one()
+        digest.update(json.dumps(tuple(row), default=str).encode("utf-8"))
+        counts[name] = row[0]
+    return digest.hexdigest(), counts
+
+
+async def export_artifact(
+    db: AsyncSession,
+    project: Dict[str, Any],
+    name: str,
+    write: Callable[[AsyncSession, Dict[str, Any], str], Awaitable[Any]]
+) -> Tuple[str, bool, Dict[str, Any]]:
+    """
+    Return the stored artifact for the current project data, writing it with
+    ``write(db, project, path)`` if the data changed since the last export.
+
+    Returns:
+        Tuple (path, cached, {"version": ..., row counts})
+    """
+    version, counts = await project_data_version(db, project)
+    path, cached = await export_store.get_or_build(
+        project["id_prg"], name, version, lambda tmp_path: write(db, project, tmp_path)
+    )
+    return path, cached, {"version": version, **counts}
+
+
+def xml_header(project: Dict[str, Any]) -> str:
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<IOExport progetto="{xml_attr(project['id_prg'])}" nome_progetto="{xml_attr(project['nome_progetto'])}">
+    <ProjectInfo>
+        <ID>{xml_text(project['id_prg'])}</ID>
+        <Name>{xml_text(project['nome_progetto'])}</Name>
+        <Description>{xml_text(project['descrizione'])}</Description>
+        <CreatedAt>{xml_text(project['data_creazione'])}</CreatedAt>
+    </ProjectInfo>
+    <IOData>"""
+
+
+def xml_signals(rows: Sequence[Any]) -> str:
+    """Format one partition of (codice, tipo, descrizione) rows as <Signal> elements"""
+    return "".join(
+        f"""
+        <Signal name="{xml_attr(row.codice)}" type="{xml_attr(row.tipo)}" description="{xml_attr(row.descrizione)}"/>"""
+        for row in rows
+    )
+
+
+async def stream_io_xml(
+    project: Dict[str, Any],
+    db: Optional[AsyncSession] = None
+) -> AsyncIterator[str]:
+    """
+    Yield the XML export of the project's I/O chunk by chunk.
+
+    Args:
+        project: Project fields as returned by load_export_project
+        db: Optional database session; by default a session is opened for the
+            duration of the stream, since a StreamingResponse body outlives the
+            request's session
+    """
+    yield xml_header(project)
+    async for chunk in in_session(db, lambda db: _xml_body(db, project["id_prg"])):
+        yield chunk
+    yield XML_FOOTER
+
+
+async def in_session(
+    db: Optional[AsyncSession],
+    body: Callable[[AsyncSession], AsyncIterator[Any]]
+) -> AsyncIterator[Any]:
+    """Run a chunk generator on ``db``, or on a new session kept open while it runs"""
+    if db is None:
+        async with AsyncSessionLocal() as db:
+            async for chunk in body(db):
+                yield chunk
+    else:
+        async for chunk in body(db):
+            yield chunk
+
+
+async def _xml_body(db: AsyncSession, id_prg: int) -> AsyncIterator[str]:
+    async for rows in iter_io_partitions(db, id_prg, IO.codice, IO.tipo, IO.descrizione):
+        yield xml_signals(rows)
+
+
+async def write_io_xml(db: AsyncSession, project: Dict[str, Any], path: str) -> int:
+    """
+    Write the XML export to ``path`` incrementally.
+
+    Returns:
+        Number of I/O signals written
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(xml_header(project))
+        async for rows in iter_io_partitions(db, project["id_prg"], IO.codice, IO.tipo, IO.descrizione):
+            f.write(xml_signals(rows))
+            count += len(rows)
+        f.write(XML_FOOTER)
+    return count
+
+
+def json_header(project: Dict[str, Any], indent: bool = False) -> bytes:
+    project = {**project, "data_creazione": str(project["data_creazione"])}
+    if indent:
+        return b'{\n  "project": ' + _json_element(project, indent) + b',\n  "io_data": ['
+    return b'{"project":' + orjson.dumps(project) + b',"io_data":['
+
+
+def json_footer(indent: bool = False, timestamp: bool = True) -> bytes:
+    """Close the document, with an exported_at field unless ``timestamp`` is False"""
+    if not timestamp:
+        return b'\n  ]\n}' if indent else b']}'
+    exported_at = orjson.dumps(str(datetime.utcnow()))
+    if indent:
+        return b'\n  ],\n  "exported_at": ' + exported_at + b'\n}'
+    return b'],"exported_at":' + exported_at + b'}'
+
+
+def _json_element(value: Any, indent: bool) -> bytes:
+    if not indent:
+        return orjson.dumps(value)
+    return orjson.dumps(value, option=orjson.OPT_INDENT_2).replace(b"\n", b"\n  ")
+
+
+def json_elements(elements: Sequence[Dict[str, Any]], first: bool, indent: bool = False) -> bytes:
+    """
+    Serialise one partition of objects as consecutive JSON array elements,
+    preceded by a separator unless it is the first partition of the array.
+    """
+    if not indent:
+        chunk = orjson.dumps(elements)[1:-1]
+        return chunk if first else b"," + chunk
+    separator = b"\n    "
+    chunk = b",".join(
+        separator + _json_element(element, indent).replace(b"\n", b"\n  ")
+        for element in elements
+    )
+    return chunk if first else b"," + chunk
+
+
+def json_array_separator(array: bytes, indent: bool = False) -> bytes:
+    """Close the previous array of the document and open ``array``"""
+    if indent:
+        return b'\n  ],\n  "' + array + b'": ['
+    return b'],"' + array + b'":['
+
+
+async def _json_body(db: AsyncSession, id_prg: int, indent: bool) -> AsyncIterator[bytes]:
+    for array, statement in (
+        (b"io_data", select(*JSON_IO_COLUMNS).where(IO.id_prg == id_prg).order_by(IO.id_io)),
+        (b"nodes", select(*JSON_NODE_COLUMNS).where(Node.id_prg == id_prg).order_by(Node.id_nodo)),
+    ):
+        if array != b"io_data":
+            yield json_array_separator(array, indent)
+        first = True
+        async for rows in iter_partitions(db, statement):
+            yield json_elements([row._asdict() for row in rows], first, indent)
+            first = False
+
+
+async def stream_io_json(
+    project: Dict[str, Any],
+    db: Optional[AsyncSession] = None,
+    indent: bool = False,
+    timestamp: bool = True
+) -> AsyncIterator[bytes]:
+    """
+    Yield the JSON export (project, I/O and nodes) chunk by chunk.
+
+    The io_data and nodes arrays are written element by element from
+    server-side cursors with orjson. Output is compact unless ``indent`` is
+    set.
+
+    Args:
+        project: Project fields as returned by load_export_project
+        db: Optional database session (a new one is opened for the stream by default)
+        indent: Pretty-print with two-space indentation
+        timestamp: Add the exported_at field
+    """
+    yield json_header(project, indent)
+    async for chunk in in_session(db, lambda db: _json_body(db, project["id_prg"], indent)):
+        yield chunk
+    yield json_footer(indent, timestamp)
+
+
+async def write_io_json(db: AsyncSession, project: Dict[str, Any], path: str) -> None:
+    """Write the compact JSON export, without exported_at, to ``path`` incrementally"""
+    with open(path, "wb") as f:
+        async for chunk in stream_io_json(project, db, timestamp=False):
+            f.write(chunk)
+
+
+def io_module_select(id_prg: int, *columns):
+    """Select of the project's I/O outer joined with their module, node and catalog entry"""
+    return (
+        select(*columns)
+        .outerjoin(HardwareNode, HardwareNode.id_nodo_hw == IO.id_modulo)
+        .outerjoin(Node, Node.id_nodo == HardwareNode.id_nodo)
+        .outerjoin(Hardware, Hardware.id_hw == HardwareNode.id_hw)
+        .where(IO.id_prg == id_prg)
+        .order_by(IO.id_io)
+    )
+
+
+def _append_rows(ws, rows: Sequence[Any]) -> None:
+    for row in rows:
+        ws.append(tuple(row))
+
+
+async def write_io_xlsx(db: AsyncSession, project: Dict[str, Any], path: str) -> int:
+    """
+    Write the I/O list of a project, joined with its node and module, as an
+    XLSX workbook.
+
+    The workbook is built in openpyxl's write_only mode, which serialises
+    every appended row immediately, so memory does not grow with the number
+    of signals. Appending and saving run in a worker thread, one partition at
+    a time, to keep the event loop free.
+
+    Returns:
+        Number of I/O signals written
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(XLSX_SHEET_NAME)
+    ws.append([header for header, _ in XLSX_COLUMNS])
+
+    statement = io_module_select(project["id_prg"], *[column for _, column in XLSX_COLUMNS])
+    count = 0
+    async for rows in iter_partitions(db, statement):
+        await asyncio.to_thread(_append_rows, ws, rows)
+        count += len(rows)
+
+    await asyncio.to_thread(wb.save, path)
+    return count
+
+
+IO_EXPORT_WRITERS = {
+    "xml": write_io_xml,
+    "json": write_io_json,
+    "xlsx": write_io_xlsx,
+}
+
+
+async def export_io_file(db: AsyncSession, project: Dict[str, Any], format_type: str) -> Dict[str, Any]:
+    """
+    Produce (or reuse) the /export_io artifact of a project in ``format_type``
+    (a key of IO_EXPORT_FILES).
+
+    Returns:
+        Dictionary with the artifact information for the API response
+    """
+    name = IO_EXPORT_FILES[format_type]
+    _, cached, info = await export_artifact(db, project, name, IO_EXPORT_WRITERS[format_type])
+    result = {
+        "message": f"Export {format_type.upper()} generato con successo",
+        "file": name,
+        "project_id": project["id_prg"],
+        "io_count": info["io"],
+        "version": info["version"],
+        "cached": cached
+    }
+    if format_type == "json":
+        result["nodes_count"] = info["nodes"]
+    return result
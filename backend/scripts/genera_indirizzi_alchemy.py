@@ -0,0 +1,282 @@
+"""
+PLC address (t_io.indirizzo) generation for the I/Os assigned to a node.
+
+Modules are laid out in slot order on two process images, inputs (%I) and
+outputs (%Q). Each module reserves whole bytes: digital modules one bit per
+channel, analog modules one word (2 bytes) per channel.
+
+    Input Digitale, slot 1, 16 ch   -> %I0.0 .. %I1.7
+    Input Analogico, slot 3, 4 ch   -> %IW2, %IW4, %IW6, %IW8
+
+I/Os that already hold a valid address of their module keep it, so wiring
+done against earlier addresses stays correct; the other I/Os take the free
+channels in the order used by the automatic assignment (position group,
+id_io). With ``renumber`` every channel is reassigned in that order.
+
+All addresses of the node are computed in memory and only the changed ones
+are written back, with bulk UPDATEs.
+"""
+import logging
+import math
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Optional, Any
+from sqlalchemy import select, update, values, column, Integer, String
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.hardware import IO
+from core.database import AsyncSessionLocal
+from core.export_store import export_store
+from scripts.assegna_io_alchemy import (
+    BULK_BATCH_SIZE, get_module_capacity_field, io_priority_key, load_node_modules
+)
+
+logger = logging.getLogger(__name__)
+
+# Capacity field -> (process image, bits per channel)
+ADDRESS_LAYOUT = {
+    "DI": ("I", 1),
+    "F_DI": ("I", 1),
+    "DO": ("Q", 1),
+    "F_DO": ("Q", 1),
+    "AI": ("I", 16),
+    "AO": ("Q", 16),
+}
+
+
+def format_address(area: str, bits_per_channel: int, start_byte: int, channel: int) -> str:
+    """Format the address of one channel of a module starting at ``start_byte``"""
+    if bits_per_channel == 1:
+        return f"%{area}{start_byte + channel // 8}.{channel % 8}"
+    return f"%{area}W{start_byte + channel * (bits_per_channel // 8)}"
+
+
+def parse_channel(
+    address: Optional[str],
+    area: str,
+    bits_per_channel: int,
+    start_byte: int,
+    channels: int
+) -> Optional[int]:
+    """Channel of ``address`` on a module starting at ``start_byte``, or None if it is not one of its addresses"""
+    if not address:
+        return None
+    try:
+        if bits_per_channel == 1:
+            byte, bit = address.removeprefix(f"%{area}").split(".")
+            if bit not in {"0", "1", "2", "3", "4", "5", "6", "7"}:
+                return None
+            channel = (int(byte) - start_byte) * 8 + int(bit)
+        else:
+            offset = int(address.removeprefix(f"%{area}W")) - start_byte
+            step = bits_per_channel // 8
+            if offset % step:
+                return None
+            channel = offset // step
+    except ValueError:
+        return None
+    if not 0 <= channel < channels or format_address(area, bits_per_channel, start_byte, channel) != address:
+        return None
+    return channel
+
+
+def plan_io_addresses(
+    modules: List[Dict[str, Any]],
+    module_ios: Dict[int, List[Dict[str, Any]]],
+    renumber: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Compute the address of every I/O of the node in one pass.
+
+    I/Os whose current indirizzo is a channel of their module keep it (the
+    first one wins if several claim the same channel); the others fill the
+    free channels in priority order.
+
+    Args:
+        modules: Node modules in slot order (as returned by load_node_modules)
+        module_ios: id_nodo_hw -> I/Os assigned to that module
+        renumber: Reassign every channel in priority order, ignoring the
+            current addresses
+
+    Returns:
+        List of {"id_io", "id_modulo", "indirizzo"}
+    """
+    cursors = {"I": 0, "Q": 0}
+    addresses: List[Dict[str, Any]] = []
+
+    for module in modules:
+        layout = ADDRESS_LAYOUT.get(get_module_capacity_field(module["tipo"]))
+        if not layout:
+            logger.warning(f"No address layout for module {module['id_nodo_hw']} ({module['tipo']})")
+            continue
+        area, bits = layout
+
+        ios = sorted(module_ios.get(module["id_nodo_hw"], []), key=io_priority_key)
+        # Manually over-filled modules still must not overlap the next one
+        channels = max(module["capacity"], len(ios))
+        start_byte = cursors[area]
+        cursors[area] += math.ceil(channels * bits / 8)
+
+        placed: Dict[int, Dict[str, Any]] = {}
+        unaddressed = []
+        for io in ios:
+            channel = None if renumber else parse_channel(io.get("indirizzo"), area, bits, start_byte, channels)
+            if channel is None or channel in placed:
+                unaddressed.append(io)
+            else:
+                placed[channel] = io
+        free = (channel for channel in range(channels) if channel not in placed)
+        for io in unaddressed:
+            placed[next(free)] = io
+
+        addresses.extend(
+            {
+                "id_io": io["id_io"],
+                "id_modulo": module["id_nodo_hw"],
+                "indirizzo": format_address(area, bits, start_byte, channel),
+            }
+            for channel, io in sorted(placed.items())
+        )
+
+    return addresses
+
+
+async def load_module_ios(db: AsyncSession, module_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """Load the I/Os assigned to the given modules, grouped by module (one query)"""
+    grouped: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    if not module_ids:
+        return grouped
+    result = await db.execute(
+        select(IO.id_io, IO.id_modulo, IO.posizione, IO.indirizzo).where(IO.id_modulo.in_(module_ids))
+    )
+    for row in result.all():
+        grouped[row.id_modulo].append(
+            {"id_io": row.id_io, "posizione": row.posizione, "indirizzo": row.indirizzo}
+        )
+    return grouped
+
+
+async def plan_assignment_addresses(
+    db: AsyncSession,
+    modules: List[Dict[str, Any]],
+    free_ios: List[Dict[str, Any]],
+    assignments: List[Dict[str, Any]]
+) -> Dict[int, str]:
+    """
+    Addresses the planned I/Os would get from genera_indirizzi_io once an
+    assignment plan is applied: the layout runs over the I/Os already on the
+    modules, which keep their addresses, plus the planned ones.
+
+    Args:
+        modules: Node modules in slot order (as returned by load_node_modules)
+        free_ios: Free I/Os the plan was drawn from (as returned by load_free_ios)
+        assignments: Planned {"id_io", "id_modulo"} pairs
+
+    Returns:
+        id_io -> indirizzo of every planned I/O
+    """
+    module_ios = await load_module_ios(db, [m["id_nodo_hw"] for m in modules])
+    free = {io["id_io"]: io for io in free_ios}
+    for a in assignments:
+        module_ios[a["id_modulo"]].append(free[a["id_io"]])
+    planned = {a["id_io"] for a in assignments}
+    return {
+        a["id_io"]: a["indirizzo"]
+        for a in plan_io_addresses(modules, module_ios)
+        if a["id_io"] in planned
+    }
+
+
+async def write_io_addresses(db: AsyncSession, addresses: List[Dict[str, Any]]) -> int:
+    """
+    Write addresses with UPDATE ... FROM (VALUES ...) statements. A row is only
+    updated while it is still assigned to the module the address was computed
+    for. The caller owns the transaction.
+
+    Returns:
+        Number of I/Os updated
+    """
+    updated = 0
+    for start in range(0, len(addresses), BULK_BATCH_SIZE):
+        batch = addresses[start:start + BULK_BATCH_SIZE]
+        data = values(
+            column("id_io", Integer),
+            column("id_modulo", Integer),
+            column("indirizzo", String),
+            name="data"
+        ).data([(a["id_io"], a["id_modulo"], a["indirizzo"]) for a in batch])
+        result = await db.execute(
+            update(IO)
+            .where(IO.id_io == data.c.id_io, IO.id_modulo == data.c.id_modulo)
+            .values(indirizzo=data.c.indirizzo)
+            .execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount
+    return updated
+
+
+async def genera_indirizzi_io(
+    id_prg: int,
+    id_nodo: int,
+    db: Optional[AsyncSession] = None,
+    renumber: bool = False
+) -> Dict[str, Any]:
+    """
+    Generate the PLC address of every I/O assigned to the node's modules.
+
+    Args:
+        id_prg: Project ID
+        id_nodo: Node ID
+        db: Optional database session (if not provided, a new one will be created)
+        renumber: Reassign all addresses in priority order instead of keeping
+            the valid existing ones
+    """
+    local_db = False
+    if db is None:
+        db = AsyncSessionLocal()
+        local_db = True
+
+    try:
+        modules = await load_node_modules(db, id_prg, id_nodo)
+        if not modules:
+            return {"success": False, "message": "No hardware modules found for the specified node"}
+
+        module_ios = await load_module_ios(db, [m["id_nodo_hw"] for m in modules])
+        current = {io["id_io"]: io["indirizzo"] for ios in module_ios.values() for io in ios}
+        addresses = [
+            a for a in plan_io_addresses(modules, module_ios, renumber)
+            if a["indirizzo"] != current[a["id_io"]]
+        ]
+
+        updated = await write_io_addresses(db, addresses)
+        await db.commit()
+        export_store.invalidate(id_prg)
+
+        logger.info(f"Generated {updated} addresses for node {id_nodo}")
+        return {
+            "success": True,
+            "message": f"Successfully addressed {updated} I/Os",
+            "total_addressed": updated
+        }
+
+    except SQLAlchemyError as e:
+        logger.error(f"Database error: {e}", exc_info=True)
+        await db.rollback()
+        return {
+            "success": False,
+            "message": f"Database error: {str(e)}"
+        }
+    finally:
+        if local_db:
+            await db.close()
+
+
+async def main():
+    """Example usage"""
+    # Example: address I/Os for project 1, node 1
+    result = await genera_indirizzi_io(1, 1)
+    print(result["message"])
+
+if __name__ == "__main__":
+    asyncio.run(main())
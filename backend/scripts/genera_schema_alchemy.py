@@ -0,0 +1,161 @@
+"""
+Electrical schema CSV generation (Schema_elettrico.csv) using async SQLAlchemy.
+
+Extracted from the /genera_schema route so it can also run as a background job.
+Rows are generated lazily from server-side cursors: stream_schema_csv feeds a
+StreamingResponse directly, while genera_schema_csv keeps the file in the
+export artifact store and regenerates it only when the project data changes.
+"""
+import csv
+import logging
+from io import StringIO
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, AsyncIterator, Iterable, Iterator, List, Sequence
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.project import Node
+from models.hardware import IO
+from core.database import AsyncSessionLocal
+from scripts.export_io_alchemy import (
+    export_artifact, in_session, iter_io_partitions, iter_partitions, load_export_project
+)
+
+logger = logging.getLogger(__name__)
+
+CSV_NAME = "Schema_elettrico.csv"
+
+
+def schema_header_rows(
+    project: Dict[str, Any],
+    io_count: int,
+    nodes_count: int,
+    timestamp: bool = True
+) -> List[List[Any]]:
+    """Header rows of the schema; the F5 details carry the generation time unless ``timestamp`` is False"""
+    generated = f"Generato il: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}" if timestamp else ""
+    return [
+        ["Foglio", "Tipo", "Descrizione", "Dettagli"],
+        ["F1", "Legenda", "Legenda simboli", f"Progetto: {project['nome_progetto']}"],
+        ["F2", "Potenza", "Motori e carichi", f"ID Progetto: {project['id_prg']}"],
+        ["F3", "IO", "Ingressi / Uscite", f"Totale IO: {io_count}"],
+        ["F4", "Nodi", "Nodi di controllo", f"Totale Nodi: {nodes_count}"],
+        ["F5", "Schema", "Schema elettrico completo", generated]
+    ]
+
+
+def io_schema_rows(rows: Sequence[Any], offset: int = 0) -> Iterator[List[Any]]:
+    """Schema rows of a partition of I/Os (tipo, descrizione, codice), numbered after ``offset``"""
+    for i, io in enumerate(rows, offset + 1):
+        yield [f"IO_{i:03d}", io.tipo, io.descrizione or "", f"Codice: {io.codice}"]
+
+
+def node_schema_rows(rows: Sequence[Any], offset: int = 0) -> Iterator[List[Any]]:
+    """Schema rows of a partition of nodes (tipo_nodo, descrizione, nome_nodo), numbered after ``offset``"""
+    for i, node in enumerate(rows, offset + 1):
+        yield [f"NODO_{i:03d}", node.tipo_nodo, node.descrizione or "", f"Nome: {node.nome_nodo}"]
+
+
+def csv_chunk(rows: Iterable[Sequence[Any]]) -> str:
+    """Format rows as ';'-separated CSV text"""
+    buffer = StringIO()
+    csv.writer(buffer, delimiter=";").writerows(rows)
+    return buffer.getvalue()
+
+
+async def schema_csv_chunks(
+    db: AsyncSession,
+    project: Dict[str, Any],
+    timestamp: bool = True
+) -> AsyncIterator[str]:
+    """
+    Yield the electrical schema CSV of a project chunk by chunk.
+
+    The totals of the header are counted first; I/O and node rows are then
+    generated lazily from server-side cursors, one partition per chunk.
+    """
+    id_prg = project["id_prg"]
+    io_count = await db.scalar(select(func.count()).select_from(IO).where(IO.id_prg == id_prg))
+    nodes_count = await db.scalar(select(func.count()).select_from(Node).where(Node.id_prg == id_prg))
+    yield csv_chunk(schema_header_rows(project, io_count, nodes_count, timestamp))
+
+    # IO details
+    offset = 0
+    async for rows in iter_io_partitions(db, id_prg, IO.tipo, IO.descrizione, IO.codice):
+        yield csv_chunk(io_schema_rows(rows, offset))
+        offset += len(rows)
+
+    # Node details
+    offset = 0
+    async for rows in iter_partitions(
+        db,
+        select(Node.tipo_nodo, Node.descrizione, Node.nome_nodo)
+        .where(Node.id_prg == id_prg).order_by(Node.id_nodo)
+    ):
+        yield csv_chunk(node_schema_rows(rows, offset))
+        offset += len(rows)
+
+
+def stream_schema_csv(project: Dict[str, Any], db: Optional[AsyncSession] = None) -> AsyncIterator[str]:
+    """
+    Yield the electrical schema CSV for a StreamingResponse body.
+
+    Args:
+        project: Project fields as returned by load_export_project
+        db: Optional database session (a new one is opened for the stream by default)
+    """
+    return in_session(db, lambda db: schema_csv_chunks(db, project))
+
+
+async def write_schema_csv(db: AsyncSession, project: Dict[str, Any], path: str) -> None:
+    """
+    Write the electrical schema CSV of a project to ``path`` incrementally.
+    The file is a stored artifact, so it carries no generation time.
+    """
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        async for chunk in schema_csv_chunks(db, project, timestamp=False):
+            f.write(chunk)
+
+
+async def genera_schema_csv(
+    id_prg: int,
+    db: Optional[AsyncSession] = None,
+    progress: Optional[Callable[..., None]] = None
+) -> Dict[str, Any]:
+    """
+    Generate the electrical schema CSV file for a project, or reuse the stored
+    one if the project data did not change since it was generated.
+
+    Args:
+        id_prg: Project ID
+        db: Optional database session (if not provided, a new one will be created)
+        progress: Optional callback receiving progress counters
+
+    Returns:
+        Dictionary with the generated file information, or {"error": ...}
+    """
+    if db is None:
+        async with AsyncSessionLocal() as db:
+            return await genera_schema_csv(id_prg, db, progress)
+
+    # Verify project exists
+    project = await load_export_project(db, id_prg)
+
+    if not project:
+        return {"error": "Progetto non trovato"}
+
+    _, cached, info = await export_artifact(db, project, CSV_NAME, write_schema_csv)
+    total_rows = 6 + info["io"] + info["nodes"]
+    if progress:
+        progress(phase="written", io=info["io"], nodes=info["nodes"], rows=total_rows, cached=cached)
+
+    return {
+        "message": "Schema CSV generato con successo",
+        "file": CSV_NAME,
+        "project_id": id_prg,
+        "io_count": info["io"],
+        "nodes_count": info["nodes"],
+        "total_sheets": total_rows,
+        "version": info["version"],
+        "cached": cached
+    }
@@ -0,0 +1,212 @@
+"""
+Pre-elaboration of utilities: expands the DI/DO/AI/AO/FDI/FDO counters of
+every unprocessed t_utenza row of a project into t_io signals.
+
+The unprocessed utilities are read with one query, their previous I/Os (if
+any) are removed, the new I/O rows are generated in memory and written with
+bulk INSERT statements, and elaborata is flipped, all in one transaction. The
+DELETE and UPDATE statements target the loaded id_utenza values directly, in
+batches of BULK_BATCH_SIZE.
+
+    M101 (DI=2, AO=1) -> M101.DI1, M101.DI2   Input Digitale
+                         M101.AO1             Output Analogico Corrente
+"""
+import logging
+import asyncio
+from collections import Counter
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.hardware import IO
+from models.project import Project
+from models.utility import Utenza
+from core.database import AsyncSessionLocal
+from core.export_store import export_store
+from scripts.assegna_io_alchemy import BULK_BATCH_SIZE, adjust_fill_levels
+
+logger = logging.getLogger(__name__)
+
+# Utility counter -> (code label, t_io.tipo). Analog signals default to the
+# current (4-20mA) variant.
+SIGNAL_TYPES = [
+    ("FDI", "FDI", "Input Digitale Fail-Safe"),
+    ("FDO", "FDO", "Output Digitale Fail-Safe"),
+    ("DI", "DI", "Input Digitale"),
+    ("DO", "DO", "Output Digitale"),
+    ("AI", "AI", "Input Analogico Corrente"),
+    ("AO", "AO", "Output Analogico Corrente"),
+]
+
+
+def is_unprocessed():
+    """Filter for utilities not yet pre-elaborated (elaborata NULL or 0)"""
+    return func.coalesce(Utenza.elaborata, 0) == 0
+
+
+def expand_utility(utility: Dict[str, Any], id_prg: int) -> Iterator[Dict[str, Any]]:
+    """Yield the t_io rows of one utility, one per counted signal"""
+    nome = utility["nome_utenza"]
+    for field, label, tipo in SIGNAL_TYPES:
+        for i in range(1, (utility[field] or 0) + 1):
+            yield {
+                "id_prg": id_prg,
+                "id_utenza": utility["id_utenza"],
+                "codice": f"{nome}.{label}{i}",
+                "descrizione": f"{label}_{i} - {nome}",
+                "tipo": tipo,
+                "zona": utility["zona"],
+            }
+
+
+def expand_utilities(utilities: Iterable[Dict[str, Any]], id_prg: int) -> Iterator[Dict[str, Any]]:
+    """Yield the t_io rows of all utilities"""
+    for utility in utilities:
+        yield from expand_utility(utility, id_prg)
+
+
+def batched(values: List[Any], size: int) -> Iterator[List[Any]]:
+    """Split a list into consecutive chunks of at most ``size`` items"""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+async def load_unprocessed_utilities(db: AsyncSession, id_prg: int) -> List[Dict[str, Any]]:
+    """Load the counters of all unprocessed utilities of the project (one query)"""
+    result = await db.execute(
+        select(
+            Utenza.id_utenza, Utenza.nome_utenza, Utenza.zona,
+            Utenza.DI, Utenza.DO, Utenza.AI, Utenza.AO, Utenza.FDI, Utenza.FDO
+        )
+        .where(Utenza.id_prg == id_prg, is_unprocessed())
+        .order_by(Utenza.id_utenza)
+    )
+    return [dict(row._mapping) for row in result.all()]
+
+
+async def delete_utility_ios(db: AsyncSession, utility_ids) -> int:
+    """
+    Delete the I/Os generated from the given utilities (a list of ids or a
+    select of id_utenza) and release their module slots. The caller owns the
+    transaction.
+
+    Returns:
+        Number of I/Os deleted
+    """
+    result = await db.execute(
+        delete(IO)
+        .where(IO.id_utenza.in_(utility_ids))
+        .returning(IO.id_modulo)
+        .execution_options(synchronize_session=False)
+    )
+    modules = result.scalars().all()
+    released = Counter(id_modulo for id_modulo in modules if id_modulo is not None)
+    await adjust_fill_levels(db, {module: -count for module, count in released.items()})
+    return len(modules)
+
+
+async def insert_ios(
+    db: AsyncSession,
+    rows: Iterable[Dict[str, Any]],
+    progress: Optional[Callable[..., None]] = None
+) -> int:
+    """Bulk insert t_io rows in batches of BULK_BATCH_SIZE. Returns the number inserted"""
+    inserted = 0
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, BULK_BATCH_SIZE))
+        if not batch:
+            return inserted
+        await db.execute(insert(IO), batch)
+        inserted += len(batch)
+        if progress:
+            progress(phase="inserting", io_created=inserted)
+
+
+async def preelabora_utenze(
+    id_prg: int,
+    db: Optional[AsyncSession] = None,
+    progress: Optional[Callable[..., None]] = None
+) -> Dict[str, Any]:
+    """
+    Expand every unprocessed utility of the project into t_io signals.
+
+    Utilities that were already expanded and got reset (e.g. changed by a
+    differential re-import) have their previous I/Os replaced.
+
+    Args:
+        id_prg: Project ID
+        db: Optional database session (if not provided, a new one will be created)
+        progress: Optional callback receiving progress counters
+
+    Returns:
+        Dictionary with the result of the operation
+    """
+    if db is None:
+        async with AsyncSessionLocal() as db:
+            return await preelabora_utenze(id_prg, db, progress)
+
+    try:
+        result = await db.execute(select(Project.id_prg).where(Project.id_prg == id_prg))
+        if result.first() is None:
+            return {"success": False, "message": "Progetto non trovato"}
+
+        utilities = await load_unprocessed_utilities(db, id_prg)
+        if progress:
+            progress(phase="loaded", utilities=len(utilities))
+        if not utilities:
+            return {
+                "success": True,
+                "message": "Nessuna utenza da pre-elaborare",
+                "utilities_processed": 0,
+                "io_created": 0,
+                "io_deleted": 0
+            }
+
+        utility_ids = [utility["id_utenza"] for utility in utilities]
+        deleted = 0
+        for batch in batched(utility_ids, BULK_BATCH_SIZE):
+            deleted += await delete_utility_ios(db, batch)
+        created = await insert_ios(db, expand_utilities(utilities, id_prg), progress)
+
+        for batch in batched(utility_ids, BULK_BATCH_SIZE):
+            await db.execute(
+                update(Utenza)
+                .where(Utenza.id_utenza.in_(batch))
+                .values(elaborata=1)
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+        export_store.invalidate(id_prg)
+
+        logger.info(
+            f"Pre-elaborated {len(utilities)} utilities of project {id_prg}: "
+            f"{created} I/Os created, {deleted} replaced"
+        )
+        return {
+            "success": True,
+            "message": f"Pre-elaborazione completata: {len(utilities)} utenze, {created} I/O generati",
+            "utilities_processed": len(utilities),
+            "io_created": created,
+            "io_deleted": deleted
+        }
+
+    except SQLAlchemyError as e:
+        logger.error(f"Database error: {e}", exc_info=True)
+        await db.rollback()
+        return {
+            "success": False,
+            "message": f"Database error: {str(e)}"
+        }
+
+
+async def main():
+    """Example usage"""
+    # Example: pre-elaborate the utilities of project 1
+    result = await preelabora_utenze(1)
+    print(result["message"])
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,9 +3,10 @@ Hardware management service
 """
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, text, delete
+from sqlalchemy import select, text, delete, update
 from models.hardware import Hardware
-from models.project import HardwareNode
+from models.project import HardwareNode, Node
+from core.export_store import export_store
 from schemas.hardware import HardwareResponse, HardwareNodeCreate, HardwareNodeResponse
 import logging
 
@@ -135,7 +136,14 @@ class HardwareService:
                     "quantita": hardware_data.quantita
                 }
             )
+            project_id = await db.scalar(select(Node.id_prg).where(Node.id_nodo == hardware_data.id_nodo))
+            # Manual change: the automatic configuration must be rebuilt next time
+            await db.execute(
+                update(Node).where(Node.id_nodo == hardware_data.id_nodo).values(config_hash=None)
+            )
             await db.commit()
+            if project_id is not None:
+                export_store.invalidate(project_id)
             
             # Get the created hardware node
             result = await db.execute(
@@ -172,11 +180,22 @@ class HardwareService:
     async def remove_hardware_from_node(self, db: AsyncSession, hardware_node_id: int) -> bool:
         """Remove hardware from a node"""
         try:
+            module = (await db.execute(
+                select(HardwareNode.id_prg, HardwareNode.id_nodo)
+                .where(HardwareNode.id_nodo_hw == hardware_node_id)
+            )).first()
             result = await db.execute(
                 text("DELETE FROM t_nodo_hw WHERE id_nodo_hw = :id"),
                 {"id": hardware_node_id}
             )
+            if module is not None:
+                # Manual change: the automatic configuration must be rebuilt next time
+                await db.execute(
+                    update(Node).where(Node.id_nodo == module.id_nodo).values(config_hash=None)
+                )
             await db.commit()
+            if module is not None:
+                export_store.invalidate(module.id_prg)
             
             return result.rowcount > 0
         except Exception as e:
@@ -5,8 +5,12 @@ from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 from models.hardware import IO
-from schemas.io import IOResponse, IOAssignRequest, IORemoveRequest
-from scripts.assegna_io_alchemy import assegna_io_automaticamente
+from schemas.io import IOResponse, IOAssignRequest, IORemoveRequest, IOBulkAssignRequest, IOBulkRemoveRequest, IOBulkResponse
+from scripts.assegna_io_alchemy import (
+    BULK_BATCH_SIZE, assegna_io_automaticamente, assegna_io_progetto, apply_io_assignments, remove_io_assignments
+)
+from scripts.genera_indirizzi_alchemy import genera_indirizzi_io
+from core.export_store import export_store
 import logging
 
 logger = logging.getLogger(__name__)
@@ -48,26 +52,14 @@ class IOService:
     async def assign_io(self, db: AsyncSession, assign_data: IOAssignRequest) -> dict:
         """Assign I/O to a module"""
         try:
-            # Check if I/O is already assigned
-            result = await db.execute(
-                select(IO.id_modulo).where(IO.id_io == assign_data.id_io)
-            )
-            current_assignment = result.scalar()
-            
-            if current_assignment:
+            # Conditional update: only applies if the I/O is not assigned yet
+            applied = await apply_io_assignments(db, [assign_data.model_dump()])
+            if not applied:
+                await db.rollback()
                 return {"error": "I/O già assegnato ad un altro modulo"}
             
-            # Assign I/O to module
-            await db.execute(
-                update(IO)
-                .where(IO.id_io == assign_data.id_io)
-                .values(
-                    id_modulo=assign_data.id_modulo,
-                    indirizzo=assign_data.indirizzo,
-                    note=assign_data.note
-                )
-            )
             await db.commit()
+            await self._invalidate_exports(db, applied)
             
             return {"success": True, "message": "I/O assegnato con successo"}
         except Exception as e:
@@ -78,12 +70,14 @@ class IOService:
     async def remove_io_assignment(self, db: AsyncSession, io_id: int) -> dict:
         """Remove I/O assignment"""
         try:
-            await db.execute(
-                update(IO)
-                .where(IO.id_io == io_id)
-                .values(id_modulo=None, indirizzo=None)
-            )
+            # Release it from the module it is on now: the removal stays typed
+            # and does nothing if the I/O is moved meanwhile
+            id_modulo = await db.scalar(select(IO.id_modulo).where(IO.id_io == io_id))
+            released = []
+            if id_modulo is not None:
+                released = await remove_io_assignments(db, [{"id_io": io_id, "id_modulo": id_modulo}])
             await db.commit()
+            await self._invalidate_exports(db, released)
             
             return {"success": True, "message": "Assegnazione I/O rimossa con successo"}
         except Exception as e:
@@ -91,12 +85,102 @@ class IOService:
             await db.rollback()
             raise
     
-    async def assign_io_automatically(self, db: AsyncSession, node_id: int, project_id: int) -> dict:
-        """Assign I/O automatically using legacy function"""
+    async def assign_io_bulk(self, db: AsyncSession, bulk_data: IOBulkAssignRequest) -> IOBulkResponse:
+        """Assign many I/Os in one transaction; already assigned I/Os are reported as conflicts"""
         try:
-            # Use existing function
-            result = assegna_io_automaticamente(project_id, node_id)
+            requested, duplicates = self._dedupe(bulk_data.assignments)
+            applied = await apply_io_assignments(db, [a.model_dump() for a in requested])
+            await db.commit()
+            await self._invalidate_exports(db, applied)
+            
+            applied_set = set(applied)
+            conflicts = [a.id_io for a in requested if a.id_io not in applied_set] + duplicates
+            return IOBulkResponse(
+                success=True,
+                message=f"{len(applied)} I/O assegnati, {len(conflicts)} in conflitto",
+                applied=applied,
+                conflicts=conflicts
+            )
+        except Exception as e:
+            logger.error(f"Error in bulk I/O assignment: {e}")
+            await db.rollback()
+            raise
+    
+    async def remove_io_assignment_bulk(self, db: AsyncSession, bulk_data: IOBulkRemoveRequest) -> IOBulkResponse:
+        """Remove many I/O assignments in one transaction; I/Os not assigned (to the given module) are conflicts"""
+        try:
+            requested, duplicates = self._dedupe(bulk_data.assignments)
+            released = await remove_io_assignments(db, [r.model_dump() for r in requested])
+            await db.commit()
+            await self._invalidate_exports(db, released)
+            
+            released_set = set(released)
+            conflicts = [r.id_io for r in requested if r.id_io not in released_set] + duplicates
+            return IOBulkResponse(
+                success=True,
+                message=f"{len(released)} assegnazioni I/O rimosse, {len(conflicts)} in conflitto",
+                applied=released,
+                conflicts=conflicts
+            )
+        except Exception as e:
+            logger.error(f"Error in bulk I/O assignment removal: {e}")
+            await db.rollback()
+            raise
+    
+    @staticmethod
+    async def _invalidate_exports(db: AsyncSession, io_ids: List[int]) -> None:
+        """Drop the stored exports of the projects owning the given I/Os"""
+        project_ids = set()
+        for start in range(0, len(io_ids), BULK_BATCH_SIZE):
+            result = await db.execute(
+                select(IO.id_prg).where(IO.id_io.in_(io_ids[start:start + BULK_BATCH_SIZE])).distinct()
+            )
+            project_ids.update(result.scalars().all())
+        for project_id in project_ids:
+            export_store.invalidate(project_id)
+    
+    @staticmethod
+    def _dedupe(items: list) -> tuple:
+        """Keep the first request per id_io; later duplicates are returned as conflicts"""
+        seen = set()
+        unique, duplicates = [], []
+        for item in items:
+            if item.id_io in seen:
+                duplicates.append(item.id_io)
+            else:
+                seen.add(item.id_io)
+                unique.append(item)
+        return unique, duplicates
+    
+    async def assign_io_automatically(
+        self, db: AsyncSession, node_id: int, project_id: int, dry_run: bool = False, incremental: bool = False
+    ) -> dict:
+        """Assign I/O automatically: set-based fill of the node's modules"""
+        try:
+            result = await assegna_io_automaticamente(
+                project_id, node_id, db, dry_run=dry_run, incremental=incremental
+            )
             return result
         except Exception as e:
             logger.error(f"Error in automatic I/O assignment: {e}")
-            raise
\ No newline at end of file
+            raise
+    
+    async def assign_io_automatically_project(self, db: AsyncSession, project_id: int) -> dict:
+        """Assign I/O automatically across all PLC nodes of a project"""
+        try:
+            result = await assegna_io_progetto(project_id, db)
+            return result
+        except Exception as e:
+            logger.error(f"Error in project-wide automatic I/O assignment: {e}")
+            raise
+    
+    async def generate_io_addresses(
+        self, db: AsyncSession, node_id: int, project_id: int, renumber: bool = False
+    ) -> dict:
+        """Generate PLC addresses for all I/O assigned to a node"""
+        try:
+            result = await genera_indirizzi_io(project_id, node_id, db, renumber=renumber)
+            return result
+        except Exception as e:
+            logger.error(f"Error generating I/O addresses: {e}")
+            raise
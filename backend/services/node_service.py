@@ -7,6 +7,7 @@ from sqlalchemy import select, text
 from models.project import Node
 from schemas.project import NodeCreate, NodeResponse
 from scripts.crea_nodo_alchemy import crea_nodo_plc_automatico
+from core.export_store import export_store
 import logging
 
 logger = logging.getLogger(__name__)
@@ -39,6 +40,7 @@ class NodeService:
             )
             db.add(node)
             await db.commit()
+            export_store.invalidate(node_data.id_prg)
             await db.refresh(node)
             return NodeResponse.from_orm(node)
         except Exception as e:
@@ -46,11 +48,10 @@ class NodeService:
             await db.rollback()
             raise
     
-    async def create_plc_automatically(self, db: AsyncSession, project_id: int) -> dict:
-        """Create PLC automatically using legacy function"""
+    async def create_plc_automatically(self, db: AsyncSession, project_id: int, group_by_zona: bool = False) -> dict:
+        """Create PLC nodes automatically, split across CPUs (optionally per zona)"""
         try:
-            # Use existing function but adapt for async context
-            result = await crea_nodo_plc_automatico(project_id, db)
+            result = await crea_nodo_plc_automatico(project_id, db, group_by_zona=group_by_zona)
             return result
         except Exception as e:
             logger.error(f"Error creating automatic PLC: {e}")
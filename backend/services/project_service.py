@@ -8,6 +8,7 @@ from sqlalchemy.orm import selectinload
 from models.project import Project
 from schemas.project import ProjectCreate, ProjectResponse
 from scripts.crea_progetto_alchemy import crea_progetto
+from core.export_store import export_store
 import logging
 
 logger = logging.getLogger(__name__)
@@ -72,6 +73,7 @@ class ProjectService:
             # Delete project (cascading deletes will handle related data)
             await db.execute(delete(Project).where(Project.id_prg == project_id))
             await db.commit()
+            export_store.invalidate(project_id)
             
             return True
         except Exception as e:
@@ -0,0 +1,8 @@
+"""
+Make the backend packages (core, models, scripts, ...) importable when the
+tests are run from the backend directory.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,29 @@
+"""
+Tests for the set-based I/O assignment statements.
+
+UPDATE ... FROM (VALUES ...) is PostgreSQL-only, so the statements are
+compiled with the asyncpg dialect used in production.
+"""
+from sqlalchemy.dialects import postgresql
+
+from scripts.assegna_io_alchemy import io_removal_update
+
+
+def compile_pg(statement) -> str:
+    return str(statement.compile(dialect=postgresql.asyncpg.dialect()))
+
+
+def test_removal_by_id_io_alone_compares_integer_module():
+    # Without any id_modulo the VALUES column holds only NULLs, which
+    # PostgreSQL types as text: the comparison must cast it back to integer
+    sql = compile_pg(io_removal_update([{"id_io": 1}, {"id_io": 2}]))
+    assert "t_io.id_modulo = CAST(data.id_modulo AS INTEGER)" in sql
+    assert "CAST(data.id_modulo AS INTEGER) IS NULL" in sql
+    assert "t_io.id_modulo = data.id_modulo" not in sql
+
+
+def test_removal_with_module_binds_both_columns():
+    statement = io_removal_update([{"id_io": 1, "id_modulo": 7}, {"id_io": 2}])
+    sql = compile_pg(statement)
+    assert "(VALUES ($3::INTEGER, $4::INTEGER), ($5::INTEGER, NULL))" in sql
+    assert "RETURNING t_io.id_io, t_io_1.id_modulo" in sql
@@ -0,0 +1,33 @@
+"""
+Tests for the differential utilities import helpers.
+"""
+from scripts.carica_file_utenze_mock_alchemy import io_signature, normalize_row
+
+
+def sheet_row(**overrides):
+    row = {
+        "nome_utenza": "M101", "descrizione": "Motore nastro", "tensione": "400V",
+        "zona": "Z1", "DI": 2, "DO": 1, "AI": 0, "AO": 0, "FDI": 0, "FDO": 0,
+        "potenza": 0,
+    }
+    row.update(overrides)
+    return normalize_row(row)
+
+
+def test_description_change_keeps_io_signature():
+    before, after = sheet_row(), sheet_row(descrizione="Motore nastro 1", tensione="230V")
+    assert before["row_hash"] != after["row_hash"]
+    assert io_signature(before) == io_signature(after)
+
+
+def test_counter_zona_or_category_change_alters_io_signature():
+    base = io_signature(sheet_row())
+    assert io_signature(sheet_row(DI=3)) != base
+    assert io_signature(sheet_row(zona="Z2")) != base
+    assert io_signature(sheet_row(potenza=5.5)) != base
+
+
+def test_stored_null_counters_match_zero():
+    stored = {"categoria": "utenza", "zona": "Z1", "DI": 2, "DO": 1,
+              "AI": None, "AO": None, "FDI": None, "FDO": None}
+    assert io_signature(stored) == io_signature(sheet_row())
@@ -0,0 +1,51 @@
+"""
+Tests for the PLC address layout.
+"""
+from scripts.genera_indirizzi_alchemy import parse_channel, plan_io_addresses
+
+DI16 = {"id_nodo_hw": 1, "tipo": "Input Digitale", "capacity": 16}
+AI4 = {"id_nodo_hw": 2, "tipo": "Input Analogico Corrente", "capacity": 4}
+
+
+def io(id_io, indirizzo=None, posizione=None):
+    return {"id_io": id_io, "posizione": posizione, "indirizzo": indirizzo}
+
+
+def addresses(plan):
+    return {a["id_io"]: a["indirizzo"] for a in plan}
+
+
+def test_fresh_layout_follows_slot_and_priority_order():
+    plan = plan_io_addresses([DI16, AI4], {
+        1: [io(10), io(11, posizione="interno_quadro")],
+        2: [io(20), io(21)],
+    })
+    assert addresses(plan) == {11: "%I0.0", 10: "%I0.1", 20: "%IW2", 21: "%IW4"}
+
+
+def test_new_higher_priority_io_takes_a_free_channel():
+    module_ios = {1: [io(10, "%I0.0"), io(11, "%I0.1"), io(12, posizione="interno_quadro")]}
+    assert addresses(plan_io_addresses([DI16], module_ios)) == {
+        10: "%I0.0", 11: "%I0.1", 12: "%I0.2"
+    }
+    assert addresses(plan_io_addresses([DI16], module_ios, renumber=True)) == {
+        12: "%I0.0", 10: "%I0.1", 11: "%I0.2"
+    }
+
+
+def test_foreign_or_duplicate_addresses_are_reassigned():
+    module_ios = {
+        1: [io(10, "%I0.3"), io(11, "%I0.3"), io(12, "%Q0.0")],
+        2: [io(20, "%IW3"), io(21, "%IW0")],
+    }
+    assert addresses(plan_io_addresses([DI16, AI4], module_ios)) == {
+        10: "%I0.3", 11: "%I0.0", 12: "%I0.1", 20: "%IW2", 21: "%IW4"
+    }
+
+
+def test_parse_channel_rejects_addresses_outside_the_module():
+    assert parse_channel("%I1.7", "I", 1, 0, 16) == 15
+    assert parse_channel("%I2.0", "I", 1, 0, 16) is None
+    assert parse_channel("%I0.8", "I", 1, 0, 16) is None
+    assert parse_channel("%IW8", "I", 16, 2, 4) == 3
+    assert parse_channel("%IW10", "I", 16, 2, 4) is None
@@ -1,7 +1,7 @@
 
 import React, { useState, useEffect } from 'react'
 import { useParams } from 'react-router-dom'
-import { apiFetch } from '../utils/api'
+import { apiFetch, apiDownload } from '../utils/api'
 import DataTable from './DataTable'
 import DataTableMulti from './DataTableMulti'
 import './AssignIOPage.css'
@@ -202,7 +202,7 @@ const AssignIOPage: React.FC = () => {
       })
       console.log(response)
       // Directly navigate to the download endpoint
-      window.location.href = `${BACKEND_URL}/api/download/export_io.${format}`
+      window.location.href = `${BACKEND_URL}/api/download/export_io.${format}?id_prg=${id}`
     } catch (err) {
       console.error("Errore durante l'esportazione IO:", err)
       alert("❌ Errore durante l'esportazione IO.")
@@ -211,17 +211,22 @@ const AssignIOPage: React.FC = () => {
 
   const esportaSchemainExcel = async () => {
     try {
-      const response = await apiFetch('/api/genera_schema', {
-        method: 'POST',
-        body: JSON.stringify({ id_prg: id })
-      })
-      window.location.href = `${BACKEND_URL}/api/download/Schema_elettrico.csv`
+      await apiDownload(`/api/genera_schema/stream?id_prg=${id}`, 'Schema_elettrico.csv')
     } catch (err) {
       console.error("Errore durante esportazione Excel:", err)
       alert("❌ Errore durante l'esportazione del file.")
     }
   }
 
+  const esportaPacchetto = async () => {
+    try {
+      await apiDownload(`/api/projects/${id}/export/bundle`, `export_progetto_${id}.zip`)
+    } catch (err) {
+      console.error("Errore durante l'esportazione del pacchetto:", err)
+      alert("❌ Errore durante l'esportazione del pacchetto.")
+    }
+  }
+
   const handleNodeChange = async (e: React.ChangeEvent<HTMLSelectElement>) => {
     const nodeId = e.target.value
     setSelectedNodo(nodeId)
@@ -416,12 +421,15 @@ const AssignIOPage: React.FC = () => {
             <button className="btn-module" onClick={assegnazioneAutomatica}>
               Assegnazione automatica
             </button>
-            <button className="btn-module" onClick={() => exportaIO('xml')}>
+            <button className="btn-module" onClick={() => exportaIO('xlsx')}>
               📊 Esporta Excel
             </button>
             <button className="btn-module" onClick={esportaSchemainExcel}>
               Genera File Schema Elettrico
             </button>
+            <button className="btn-module" onClick={esportaPacchetto}>
+              📦 Esporta pacchetto completo
+            </button>
           </div>
         </div>
         
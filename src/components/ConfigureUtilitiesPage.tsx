@@ -219,7 +219,7 @@ const ConfigureUtilitiesPage: React.FC = () => {
       const response = await apiFetch('/api/preelabora_utenze', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({})
+        body: JSON.stringify({ id_prg: parseInt(id || '0') })
       });
       
       setProcessingStatus(response.message || 'Pre-elaborazione completata');
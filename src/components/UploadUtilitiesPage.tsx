@@ -1,7 +1,7 @@
 
 import React, { useState } from 'react';
 import { useParams } from 'react-router-dom';
-import { apiFetch } from '../utils/api';
+import { apiFetch, apiEventStream } from '../utils/api';
 import {
   Box,
   Card,
@@ -26,6 +26,7 @@ const UploadUtilitiesPage: React.FC = () => {
   const [selectedFile, setSelectedFile] = useState<File | null>(null);
   const [isUploading, setIsUploading] = useState(false);
   const [message, setMessage] = useState<{ text: string; type: 'success' | 'error' | 'info' } | null>(null);
+  const [progress, setProgress] = useState<{ phase: string; rows?: number; inserted?: number } | null>(null);
 
   const handleFileChange = (event: React.ChangeEvent<HTMLInputElement>) => {
     const file = event.target.files?.[0];
@@ -52,62 +53,43 @@ const UploadUtilitiesPage: React.FC = () => {
       const formData = new FormData();
       formData.append('file', selectedFile);
 
-      const response = await apiFetch(`/api/progetti/${id}/carica_file_utenze`, {
+      // Streaming variant: progress events, then the same payload as /carica_file_utenze
+      let response: any = null;
+      let failure: any = null;
+      await apiEventStream(`/api/progetti/${id}/carica_file_utenze/stream`, {
         method: 'POST',
         body: formData,
-        headers: {},
-      });
-
-      if (response.status === 'confirmation_required') {
-        const confirmed = window.confirm(
-          'Sono già presenti utenze per questo progetto. Vuoi sovrascriverle?'
-        );
-        
-        if (confirmed) {
-          await confirmUpload(response.data.tempFilePath);
-        } else {
-          setMessage({ text: 'Upload cancelled', type: 'info' });
+      }, (event, data) => {
+        if (event === 'progress') {
+          setProgress((previous) => ({ ...previous, ...data }));
+        } else if (event === 'result') {
+          response = data;
+        } else if (event === 'error') {
+          failure = data;
         }
-      } else {
-        setMessage({ text: response.message || 'File uploaded successfully!', type: 'success' });
-        setSelectedFile(null);
-        const fileInput = document.getElementById('file-input') as HTMLInputElement;
-        if (fileInput) fileInput.value = '';
-      }
-    } catch (error: any) {
-      console.error('Upload error:', error);
-      setMessage({ 
-        text: error.message || 'Error uploading file. Please try again.', 
-        type: 'error' 
       });
-    } finally {
-      setIsUploading(false);
-    }
-  };
 
-  const confirmUpload = async (filePath: string) => {
-    try {
-      const response = await apiFetch(`/api/progetti/${id}/carica_file_utenze`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ 
-          conferma: true, 
-          file_path: filePath 
-        }),
-      });
+      if (failure || !response) {
+        const details = (failure?.errors || [])
+          .slice(0, 10)
+          .map((e: any) => `riga ${e.row}, ${e.column}: ${e.error}`)
+          .join('; ');
+        throw new Error([failure?.message || 'Errore sconosciuto', details].filter(Boolean).join(' — '));
+      }
 
       setMessage({ text: response.message || 'File uploaded successfully!', type: 'success' });
       setSelectedFile(null);
       const fileInput = document.getElementById('file-input') as HTMLInputElement;
       if (fileInput) fileInput.value = '';
     } catch (error: any) {
-      console.error('Confirmation error:', error);
+      console.error('Upload error:', error);
       setMessage({ 
-        text: error.message || 'Error confirming upload.', 
+        text: error.message || 'Error uploading file. Please try again.', 
         type: 'error' 
       });
+    } finally {
+      setIsUploading(false);
+      setProgress(null);
     }
   };
 
@@ -221,6 +203,11 @@ const UploadUtilitiesPage: React.FC = () => {
               <Box sx={{ mt: 2 }}>
                 <Typography variant="body2" color="text.secondary" gutterBottom>
                   Elaborazione file in corso...
+                  {progress && ` (${progress.phase}${
+                    progress.inserted !== undefined && progress.rows
+                      ? `: ${progress.inserted}/${progress.rows} righe`
+                      : progress.rows !== undefined ? `: ${progress.rows} righe` : ''
+                  })`}
                 </Typography>
                 <LinearProgress />
               </Box>
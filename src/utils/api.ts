@@ -78,3 +78,109 @@ export async function apiFetch(url: string, options: RequestInit = {}): Promise<
     throw error
   }
 }
+
+/**
+ * Effettua una chiamata che risponde con Server-Sent Events (text/event-stream)
+ * e inoltra ogni evento a `onEvent` man mano che arriva.
+ *
+ * @param {string} url - L'URL della richiesta.
+ * @param {RequestInit} [options={}] - Le opzioni per la chiamata fetch.
+ * @param {(event: string, data: any) => void} onEvent - Callback per ogni evento ricevuto.
+ * @throws {Error} - Se la risposta non è ok.
+ */
+export async function apiEventStream(
+  url: string,
+  options: RequestInit = {},
+  onEvent: (event: string, data: any) => void
+): Promise<void> {
+  const token = localStorage.getItem('access_token')
+  const headers: Record<string, string> = {
+    ...(options.headers as Record<string, string> || {}),
+    Accept: 'text/event-stream',
+  }
+  if (token) {
+    headers['Authorization'] = `Bearer ${token}`
+  }
+
+  const response = await fetch(`http://localhost:8000${url}`, {
+    ...options,
+    headers,
+  })
+
+  if (!response.ok || !response.body) {
+    if (response.status === 401) {
+      localStorage.removeItem('access_token')
+      window.location.href = '/login'
+    }
+    const data = await response.json().catch(() => ({}))
+    throw new Error(data.detail?.message || data.detail || data.error || 'Errore sconosciuto')
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+
+    // Events are separated by a blank line
+    let separator = buffer.indexOf('\n\n')
+    while (separator !== -1) {
+      const block = buffer.slice(0, separator)
+      buffer = buffer.slice(separator + 2)
+      let event = 'message'
+      let data = ''
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim()
+        else if (line.startsWith('data:')) data += line.slice(5).trim()
+      }
+      if (data) onEvent(event, JSON.parse(data))
+      separator = buffer.indexOf('\n\n')
+    }
+  }
+}
+
+/**
+ * Scarica un file generato dal backend con una sola chiamata autenticata
+ * (es. una risposta in streaming) e lo salva con il nome indicato.
+ *
+ * @param {string} url - L'URL della richiesta.
+ * @param {string} filename - Il nome del file salvato.
+ * @param {RequestInit} [options={}] - Le opzioni per la chiamata fetch.
+ * @throws {Error} - Se la risposta non è ok.
+ */
+export async function apiDownload(url: string, filename: string, options: RequestInit = {}): Promise<void> {
+  const token = localStorage.getItem('access_token')
+  const headers: Record<string, string> = {
+    ...(options.headers as Record<string, string> || {}),
+  }
+  if (token) {
+    headers['Authorization'] = `Bearer ${token}`
+  }
+
+  const response = await fetch(`http://localhost:8000${url}`, {
+    ...options,
+    headers,
+  })
+
+  if (!response.ok) {
+    if (response.status === 401) {
+      localStorage.removeItem('access_token')
+      window.location.href = '/login'
+    }
+    const data = await response.json().catch(() => ({}))
+    throw new Error(data.detail || data.error || 'Errore sconosciuto')
+  }
+
+  const blob = await response.blob()
+  const downloadUrl = window.URL.createObjectURL(blob)
+  const link = document.createElement('a')
+  link.href = downloadUrl
+  link.download = filename
+  document.body.appendChild(link)
+  link.click()
+  document.body.removeChild(link)
+  window.URL.revokeObjectURL(downloadUrl)
+}